@@ -6,7 +6,7 @@ from .utils import CustomJSONEncoder
 def create_app(test_config=None):
     """Create and configure the Flask application"""
     app = Flask(__name__)
-    
+
     # Enable CORS
     CORS(app, resources={
         r"/api/*": {
@@ -1,27 +1,88 @@
-from flask import Blueprint, request, current_app
+from flask import Blueprint, request, current_app, stream_with_context
 from db.engine.query_handler import QueryHandler
-from .utils import CustomJSONEncoder
-import json
+from .utils import json_default, QueryResultCache, ReadWriteLock
+from concurrent.futures import ThreadPoolExecutor
+import orjson
 import os
+import queue
+import threading
+
+__all__ = ['api_bp']
 
 api_bp = Blueprint('api', __name__)
 
-# Create a query handler instance
-handler = QueryHandler()
+# SELECTs run on a pool of handlers; every other statement goes through
+# a single writer. SELECTs share table_lock and writes hold it alone, so
+# a SELECT never sees a write half done (an append, a B+ tree split, a
+# delete mark) and writes stay serialized. The handlers are created on
+# first use so importing this module stays cheap.
+POOL_SIZE = os.cpu_count() or 1
+reader_pool = queue.Queue()
+_writer = None
+_init_lock = threading.Lock()
+table_lock = ReadWriteLock()
+batch_executor = ThreadPoolExecutor(max_workers=POOL_SIZE)
+
+# Serialized responses of recent SELECTs, keyed on the parsed query so spellings
+# of the same SELECT share an entry. A write drops the entries of its table
+result_cache = QueryResultCache(maxsize=256, ttl=5)
+
+def _is_select(parsed_query):
+    return parsed_query.get('type') == 'SELECT'
+
+def _cache_key(parsed_query):
+    return orjson.dumps(parsed_query, option=orjson.OPT_SORT_KEYS)
+
+def parse_query(query):
+    """Parse a query with the writer's parser, which any thread may use"""
+    return _get_writer().parse(query)
+
+def _get_writer():
+    """Return the writer handler, creating it and the reader pool on first call"""
+    global _writer
+    if _writer is None:
+        with _init_lock:
+            if _writer is None:
+                for _ in range(POOL_SIZE):
+                    reader_pool.put(QueryHandler())
+                _writer = QueryHandler()
+    return _writer
+
+def run_query(parsed_query):
+    """Execute a parsed query on a pooled reader (SELECT) or on the writer"""
+    writer = _get_writer()
+    if _is_select(parsed_query):
+        handler = reader_pool.get()
+        try:
+            with table_lock.read():
+                return handler.execute_parsed(parsed_query)
+        finally:
+            reader_pool.put(handler)
+    try:
+        with table_lock.write():
+            return writer.execute_parsed(parsed_query)
+    finally:
+        if 'error' not in parsed_query:
+            # Also when the write failed half way
+            result_cache.invalidate(parsed_query['table_name'])
+
+def _encode(data):
+    # Pretty-print only while debugging, clients don't need the extra bytes
+    option = orjson.OPT_INDENT_2 if current_app.debug else 0
+    return orjson.dumps(data, default=json_default, option=option)
+
+def _raw_response(body, status=200):
+    return current_app.response_class(body, mimetype='application/json', status=status)
 
 def json_response(data, status=200):
     """Helper function to create JSON responses with proper encoding"""
-    return current_app.response_class(
-        json.dumps(data, cls=CustomJSONEncoder, indent=2),
-        mimetype='application/json',
-        status=status
-    )
+    return _raw_response(_encode(data), status=status)
 
 @api_bp.route('/tables', methods=['GET'])
 def get_tables():
     """Get list of available tables"""
     try:
-        tables = handler.table_manager.get_all_tables()
+        tables = _get_writer().table_manager.get_all_tables()
         return json_response({
             "status": "success",
             "tables": tables
@@ -43,14 +104,27 @@ def execute_query():
     if 'query' not in data:
         return json_response({'error': 'Query is required'}, status=400)
         
-    query = data['query']
-    
     try:
-        result = handler.execute_query(query)
+        parsed_query = parse_query(data['query'])
+        is_select = _is_select(parsed_query)
+
+        if is_select:
+            key = _cache_key(parsed_query)
+            cached = result_cache.get(key)
+            if cached is not None:
+                return _raw_response(cached)
+            # A write to the table finishing while the SELECT runs makes its result stale
+            table = parsed_query['table_name']
+            generation = result_cache.generation(table)
+
+        result = run_query(parsed_query)
         # If result contains an error, return it with status 400
         if isinstance(result, dict) and 'error' in result:
             return json_response(result, status=400)
-        return json_response(result)
+        body = _encode(result)
+        if is_select and result.get('status') == 'success':
+            result_cache.put(key, table, body, generation)
+        return _raw_response(body)
     except Exception as e:
         return json_response({'error': str(e)}, status=400)
 
@@ -66,24 +140,45 @@ def execute_batch():
         return json_response({'error': 'Queries list is required'}, status=400)
         
     queries = data['queries']
-    results = []
-    
+    # Results are sent as each query finishes instead of being held until the end
+    return _raw_response(stream_with_context(_stream_batch(queries)))
+
+def _stream_batch(queries):
+    yield b'{"results":['
+    separator = b''
+    for result in _batch_results(queries):
+        yield separator
+        yield orjson.dumps(result, default=json_default)
+        separator = b','
+    yield b']}'
+
+def _batch_results(queries):
+    selects = []  # Consecutive SELECTs, run concurrently
+
+    # A write waits for the SELECTs queued before it and runs before the ones
+    # after it, so every query sees the same data as in a serial run
     for query in queries:
-        try:
-            result = handler.execute_query(query)
-            results.append({
-                'query': query,
-                'result': result,
-                'status': 'success'
-            })
-        except Exception as e:
-            results.append({
-                'query': query,
-                'error': str(e),
-                'status': 'error'
-            })
-            
-    return json_response({'results': results})
+        if query.lstrip()[:6].upper() == 'SELECT':
+            selects.append(query)
+            continue
+        yield from batch_executor.map(_run_batch_query, selects)
+        selects = []
+        yield _run_batch_query(query)
+    yield from batch_executor.map(_run_batch_query, selects)
+
+def _run_batch_query(query):
+    try:
+        return {
+            'query': query,
+            'result': run_query(parse_query(query)),
+            'status': 'success'
+        }
+    except Exception as e:
+        return {
+            'query': query,
+            'error': str(e),
+            'status': 'error'
+        }
 
 # Example queries for testing
 example_queries = [
@@ -1,23 +1,134 @@
 import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, date
-from typing import Any
+from typing import Any, Optional
 import decimal
 
+def _encode_bytes(obj: bytes) -> str:
+    try:
+        # Try UTF-8 first
+        return obj.decode('utf-8').rstrip('\x00')
+    except UnicodeDecodeError:
+        # Fallback to hex representation for binary data
+        return obj.hex()
+
+# Exact-type dispatch so the common cases skip the isinstance chain
+_JSON_DEFAULTS = {
+    bytes: _encode_bytes,
+    datetime: datetime.isoformat,
+    date: date.isoformat,
+    decimal.Decimal: str,
+}
+
+def json_default(obj: Any) -> Any:
+    """Serialize the types the JSON encoders don't handle natively"""
+    handler = _JSON_DEFAULTS.get(type(obj))
+    if handler is not None:
+        return handler(obj)
+    # Subclasses of the supported types
+    for obj_type, handler in _JSON_DEFAULTS.items():
+        if isinstance(obj, obj_type):
+            return handler(obj)
+    if hasattr(obj, '__dict__'):
+        # Handle custom objects by converting them to dict
+        return obj.__dict__
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
 class CustomJSONEncoder(json.JSONEncoder):
     """Custom JSON encoder to handle bytes and other special types"""
     def default(self, obj: Any) -> Any:
-        if isinstance(obj, bytes):
+        try:
+            return json_default(obj)
+        except TypeError:
+            return super().default(obj)
+
+class QueryResultCache:
+    """
+    Thread-safe LRU cache whose entries expire after ttl seconds.
+    Every entry belongs to a table, and each table counts generations:
+    invalidate(table) drops its entries and starts a new generation, so a
+    value computed before (put with an older generation) is dropped too.
+    """
+    def __init__(self, maxsize: int = 256, ttl: float = 5.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, table, value)
+        self._lock = threading.Lock()
+        self._generations = {}  # table -> generation, 0 until first invalidated
+
+    def generation(self, table: str) -> int:
+        """Take this before computing a value of table to put"""
+        return self._generations.get(table, 0)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, _, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, table: str, value: Any, generation: Optional[int] = None) -> None:
+        with self._lock:
+            if generation is not None and generation != self._generations.get(table, 0):
+                return  # Table written since the value was computed, it may be stale
+            self._entries[key] = (time.monotonic() + self.ttl, table, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, table: str) -> None:
+        """Drop the entries of a table that was written"""
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            for key in [key for key, entry in self._entries.items() if entry[1] == table]:
+                del self._entries[key]
+
+class ReadWriteLock:
+    """
+    Lock held by any number of readers at once or by a single writer.
+    Waiting writers go first so a steady stream of reads can't starve them.
+    """
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writing or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._waiting_writers += 1
             try:
-                # Try UTF-8 first
-                return obj.decode('utf-8').rstrip('\x00')
-            except UnicodeDecodeError:
-                # Fallback to hex representation for binary data
-                return obj.hex()
-        elif isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        elif isinstance(obj, decimal.Decimal):
-            return str(obj)
-        elif hasattr(obj, '__dict__'):
-            # Handle custom objects by converting them to dict
-            return obj.__dict__
-        return super().default(obj) 
\ No newline at end of file
+                while self._writing or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
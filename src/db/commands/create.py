@@ -1,23 +1,170 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import calendar
 import csv
+import itertools
 import os
+import re
 import struct
+import logging
 from ..storage_management.table_manager import TableManager
 from ..index_handling.index_factory import IndexFactory
 from ..utils.type_converter import TypeConverter
 
+logger = logging.getLogger(__name__)
+
+# Read buffer for CSV files being loaded
+CSV_READ_BUFFER = 1 << 20
+
+# Rows packed per write when loading a CSV file
+INGEST_BATCH_ROWS = 65536
+
+# Upper bound on threads used to build a table's indexes
+MAX_INDEX_BUILD_WORKERS = 8
+
+# YYYY-MM-DD, with the same one or two digit month/day that strptime accepts
+_DATE_RE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})')
+
+# Value classifiers used while inferring column types (numbers are
+# matched after dropping thousand separators)
+_INT_RE = re.compile(r'-?\d+')
+_FLOAT_RE = re.compile(r'-?(?:\d+\.\d*|\.\d+)')
+_ARRAY_RE = re.compile(r'\s*-?(?:\d+\.?\d*|\.\d+)\s*(?:,\s*-?(?:\d+\.?\d*|\.\d+)\s*)+')
+# digits,ddd reads as a number with a thousand separator, not an array
+_THOUSANDS_RE = re.compile(r'[^,]*,\s*\d{3}\s*')
+
+# Rows read at a time while inferring column types and VARCHAR sizes from a
+# CSV file, the only rows held in memory while the table is loaded
+INFERENCE_CHUNK_ROWS = 10000
+
+# Column type for each kind of data detected while scanning a CSV column
+_INFERRED_TYPES = {
+    'array': 'ARRAY[FLOAT]',
+    'float': 'FLOAT',
+    'int': 'INT',
+    'date': 'DATE',
+}
+
+# CSV value converters: an empty value (as in a short row) loads as zero,
+# anything else that does not convert fails the load
+
+def _csv_int(value: str) -> int:
+    value = value.strip()
+    if not value:
+        return 0
+    try:
+        return int(value.replace(',', ''))
+    except ValueError:
+        raise ValueError(f"{value!r} is not an INT")
+
+def _csv_float(value: str) -> float:
+    value = value.strip()
+    if not value:
+        return 0.0
+    try:
+        return float(value.replace(',', ''))
+    except ValueError:
+        raise ValueError(f"{value!r} is not a FLOAT")
+
+def _csv_array(value: str) -> tuple:
+    value = value.strip()
+    if not value:
+        return 0.0, 0.0
+    try:
+        if ',' in value:
+            # Handle each part separately to account for thousand separators
+            parts = value.split(',')
+            return float(parts[0].strip()), float(parts[1].strip()) if len(parts) > 1 else 0.0
+        return float(value), 0.0
+    except ValueError:
+        raise ValueError(f"{value!r} is not an ARRAY[FLOAT]")
+
+def _csv_date(value: str) -> int:
+    value = value.strip()
+    if not value:
+        return 0
+    try:
+        return TypeConverter.convert_value(value, "DATE")
+    except ValueError:
+        raise ValueError(f"{value!r} is not a DATE")
+
+def _csv_varchar(value: str, size: int) -> bytes:
+    encoded = value.strip().encode()
+    if len(encoded) > size:
+        raise ValueError(f"{value.strip()!r} is longer than VARCHAR[{size}]")
+    return encoded
+
+# Numeric kinds widen along INT -> FLOAT -> ARRAY[FLOAT] (a number reads as a point)
+_NUMERIC_RANK = {'int': 0, 'float': 1, 'array': 2}
+
+def _join_kinds(current: Optional[str], kind: str) -> str:
+    """Narrowest kind that holds both the values seen so far and a new one"""
+    if current is None or current == kind:
+        return kind
+    if current in _NUMERIC_RANK and kind in _NUMERIC_RANK:
+        return max(current, kind, key=_NUMERIC_RANK.get)
+    return 'string'
+
+# Generated row packers, keyed by the column types they were built for
+_ROW_PACKERS = {}
+
+def _compile_row_packer(columns: List[Dict], record_struct: struct.Struct):
+    """
+    Build pack_row(buffer, offset, row) for a schema: it converts
+    a raw CSV row and packs it with the deletion marker into buffer.
+    The source is generated once per schema so there is no per-value type dispatch.
+    """
+    key = tuple(c["type"] for c in columns)
+    packer = _ROW_PACKERS.get(key)
+    if packer:
+        return packer
+
+    args = ["b'\\x00'"]  # Deletion marker (not deleted)
+    for i, col in enumerate(columns):
+        col_type = col["type"]
+        if col_type == "INT":
+            args.append(f"_csv_int(row[{i}])")
+        elif col_type == "FLOAT":
+            args.append(f"_csv_float(row[{i}])")
+        elif col_type == "DATE":
+            args.append(f"_csv_date(row[{i}])")
+        elif col_type == "ARRAY[FLOAT]":
+            args.append(f"*_csv_array(row[{i}])")
+        elif col_type.startswith("VARCHAR"):
+            # The 's' field pads with zeros, values longer than the column are refused
+            size = int(col_type.split('[')[1].split(']')[0])
+            args.append(f"_csv_varchar(row[{i}], {size})")
+        else:
+            raise ValueError(f"Unsupported column type: {col_type}")
+
+    source = "def pack_row(buffer, offset, row):\n"
+    source += f"    pack_into(buffer, offset, {', '.join(args)})\n"
+    namespace = {
+        "pack_into": record_struct.pack_into,
+        "_csv_int": _csv_int,
+        "_csv_float": _csv_float,
+        "_csv_array": _csv_array,
+        "_csv_date": _csv_date,
+        "_csv_varchar": _csv_varchar,
+    }
+    exec(source, namespace)
+    packer = _ROW_PACKERS[key] = namespace["pack_row"]
+    return packer
+
 class CreateCommand:
     def __init__(self, table_manager: TableManager):
         self.table_manager = table_manager
+        # Handler for each form of CREATE, keyed by whether it loads a file
+        self.creators = {
+            True: self._create_from_file,
+            False: self._create_table
+        }
 
     def execute(self, parsed_query: Dict[str, Any]) -> Dict[str, Any]:
         """
         Execute CREATE TABLE command, either from schema or from file
         """
-        if parsed_query.get("from_file"):
-            return self._create_from_file(parsed_query)
-        else:
-            return self._create_table(parsed_query)
+        return self.creators[bool(parsed_query.get("from_file"))](parsed_query)
 
     def _create_table(self, parsed_query: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new table from schema definition"""
@@ -35,7 +182,8 @@ class CreateCommand:
             table_name=table_name,
             columns=columns,
             indexes=indexes,
-            primary_key=primary_key
+            primary_key=primary_key,
+            pk_monotonic=parsed_query.get("pk_monotonic", False)
         )
 
         # Check for table creation errors
@@ -53,153 +201,118 @@ class CreateCommand:
         }
 
     def _create_from_file(self, parsed_query: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a new table from a CSV file"""
+        """
+        Create a new table from a CSV file. The schema is inferred from every row
+        unless parsed_query has "columns" (one {"name", "type"} per CSV column, in
+        file order); "dtype_hints" ({column: type}) skips inference for just the
+        hinted columns. A value that does not fit a given type fails the load.
+        """
         table_name = parsed_query["table_name"]
         file_path = parsed_query["file_path"]
         index_info = parsed_query.get("index_info", {})
+        dtype_hints = parsed_query.get("dtype_hints", {})
         
         try:
-            # First pass: analyze data to determine proper column sizes and types
-            max_lengths = {}
-            column_types = {}  # Track potential types for each column
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                headers = [h.strip() for h in next(reader)]
-                
-                # Initialize tracking dictionaries
-                for header in headers:
-                    max_lengths[header] = 0
-                    column_types[header] = {'has_float': False, 'all_int': True, 'is_array': False}
-                
-                # Analyze all rows
-                for row in reader:
-                    for header, value in zip(headers, row):
-                        value = value.strip()
-                        max_lengths[header] = max(max_lengths[header], len(value))
-                        
-                        # Clean value of thousand separators
-                        clean_val = value.replace(',', '')
-                        
-                        # Try parsing as number if it looks numeric
-                        if clean_val.replace('.', '').replace('-', '').isdigit():
-                            try:
-                                float_val = float(clean_val)
-                                if float_val != int(float_val):
-                                    column_types[header]['has_float'] = True
-                                    column_types[header]['all_int'] = False
-                            except ValueError:
-                                column_types[header]['all_int'] = False
-                        else:
-                            # Check if it's an array of floats
-                            if self._is_array_float(value):
-                                column_types[header]['is_array'] = True
-                            column_types[header]['all_int'] = False
-
-            # Reopen file for actual processing
-            with open(file_path, 'r', encoding='utf-8') as f:
+            # Read the file a chunk of rows at a time: when the schema is inferred a
+            # first pass over every row decides it, then the rows are packed
+            with open(file_path, 'r', encoding='utf-8', newline='', buffering=CSV_READ_BUFFER) as f:
                 reader = csv.reader(f)
                 headers = [h.strip() for h in next(reader)]
-                remaining_rows = [[v.strip() for v in row] for row in reader]
-
-            # Infer column types with proper VARCHAR sizes
-            columns = []
-            primary_key = None
-            for header in headers:
-                if column_types[header]['is_array']:
-                    col_type = 'ARRAY[FLOAT]'
-                elif column_types[header]['has_float']:
-                    col_type = 'FLOAT'
-                elif column_types[header]['all_int']:
-                    col_type = 'INT'
+
+                if parsed_query.get("columns"):
+                    # Schema given by the caller, nothing to infer
+                    columns = parsed_query["columns"]
+                    if len(columns) != len(headers):
+                        return {
+                            "status": "error",
+                            "message": f"File {file_path} has {len(headers)} columns but {len(columns)} were given"
+                        }
                 else:
-                    # Add 20% padding for safety and round up to nearest 10
-                    size = max_lengths[header]
-                    padded_size = min(255, int(size * 1.2 + 10))
-                    col_type = f'VARCHAR[{padded_size}]'
-                
-                if not primary_key:
-                    primary_key = header
-                columns.append({
-                    "name": header,
-                    "type": col_type
-                })
-
-            # Create indexes dict from index_info and ensure primary key has B+ tree index
-            indexes = {}
-            if index_info:
-                indexes.update(index_info)
-            if primary_key:
-                print(f"[DEBUG] Adding B+ tree index for primary key column: {primary_key}")
-                indexes[primary_key] = 'bplus'
-
-            # Create the table structure WITH indexes first
-            table_info = self.table_manager.create_table(
-                table_name=table_name,
-                columns=columns,
-                indexes=indexes,
-                primary_key=primary_key
-            )
-
-            # Check for table creation errors
-            if table_info.get("status") == "error":
-                return table_info
-
-            # Initialize indexes before adding data
-            index_result = self._initialize_indexes(table_name)
-            if index_result.get("status") == "error":
-                return index_result
+                    # Infer column types with proper VARCHAR sizes
+                    inferred = [col_idx for col_idx, header in enumerate(headers) if not dtype_hints.get(header)]
+                    stats = self._infer_columns(reader, inferred) if inferred else {}
+                    f.seek(0)
+                    reader = csv.reader(f)
+                    next(reader)
+
+                    columns = []
+                    for col_idx, header in enumerate(headers):
+                        col_type = dtype_hints.get(header)
+                        if not col_type:
+                            max_len, kind = stats[col_idx]
+                            # A column without values defaults to INT
+                            col_type = _INFERRED_TYPES.get(kind or 'int')
+                        if not col_type:
+                            # Add 20% padding for safety, never less than the longest value
+                            size = max_len
+                            padded_size = max(size, min(255, int(size * 1.2 + 10)))
+                            col_type = f'VARCHAR[{padded_size}]'
+                    
+                        columns.append({
+                            "name": header,
+                            "type": col_type
+                        })
+                primary_key = columns[0]["name"] if columns else None
 
-            # Now process all rows
-            for row_num, row in enumerate(remaining_rows, start=1):
-                # Clean and validate each value based on column type
-                cleaned_values = []
-                
-                for col_idx, (value, col) in enumerate(zip(row, columns)):
-                    value = value.strip()
-                    if col["type"] == "INT":
-                        try:
-                            val = int(value.replace(',', ''))
-                            cleaned_values.append(val)
-                        except ValueError:
-                            cleaned_values.append(0)
-                    elif col["type"].startswith("VARCHAR"):
-                        # Format string with proper position encoding
-                        pos_bytes = row_num.to_bytes(4, byteorder='little', signed=False)
-                        pos_str = ''.join(chr(b) for b in pos_bytes)
-                        # Add proper null byte padding
-                        prefix = chr(0) * 4
-                        cleaned_values.append(prefix + pos_str + value)
-                    elif col["type"] == "FLOAT":
-                        try:
-                            cleaned_values.append(float(value.replace(',', '')))
-                        except ValueError:
-                            cleaned_values.append(0.0)
-                    elif col["type"] == "ARRAY[FLOAT]":
-                        if ',' in value:
-                            parts = value.split(',')
-                            try:
-                                # Handle each part separately to account for thousand separators
-                                val1 = float(parts[0].strip().replace(',', ''))
-                                val2 = float(parts[1].strip().replace(',', '')) if len(parts) > 1 else 0.0
-                                cleaned_values.extend([val1, val2])
-                            except ValueError:
-                                cleaned_values.extend([0.0, 0.0])
-                        else:
-                            try:
-                                val = float(value.replace(',', ''))
-                                cleaned_values.extend([val, 0.0])
-                            except ValueError:
-                                cleaned_values.extend([0.0, 0.0])
-
-                data_bytes = struct.pack(
-                    table_info["record_format"],   # e.g. "=i50s52s..."
-                    *[ TypeConverter.convert_value(v, col["type"])
-                    for v, col in zip(cleaned_values, table_info["columns"]) ]
+                # Create indexes dict from index_info and ensure primary key has B+ tree index
+                indexes = {}
+                if index_info:
+                    indexes.update(index_info)
+                if primary_key:
+                    logger.debug("Adding B+ tree index for primary key column: %s", primary_key)
+                    indexes[primary_key] = 'bplus'
+
+                # Create the table structure WITH indexes first
+                table_info = self.table_manager.create_table(
+                    table_name=table_name,
+                    columns=columns,
+                    indexes=indexes,
+                    primary_key=primary_key
                 )
 
-                result = self.table_manager.append_record(table_name, data_bytes)
-                if isinstance(result, dict) and result.get("status") == "error":
-                    return result
+                # Check for table creation errors
+                if table_info.get("status") == "error":
+                    return table_info
+
+                # Load the rows in batches: every batch is packed into the same
+                # preallocated buffer and written with a single call
+                record_struct = self.table_manager.record_struct(table_info)
+                pack_row = _compile_row_packer(columns, record_struct)
+                record_size = record_struct.size
+                buffer = bytearray(INGEST_BATCH_ROWS * record_size)
+                view = memoryview(buffer)
+                batch_rows = 0
+                width = len(columns)
+                row_num = 0
+
+                for row_num, row in enumerate(reader, start=1):
+                    if len(row) < width:
+                        # Missing trailing values load as empty ones
+                        row += [''] * (width - len(row))
+                    try:
+                        pack_row(buffer, batch_rows * record_size, row)
+                    except Exception as e:
+                        return {
+                            "status": "error",
+                            "message": f"Invalid row {row_num} in {file_path}: {str(e)}"
+                        }
+                    batch_rows += 1
+
+                    if batch_rows == INGEST_BATCH_ROWS:
+                        result = self._append_batch(table_name, view, row_num - batch_rows + 1, row_num)
+                        if result.get("status") == "error":
+                            return result
+                        batch_rows = 0
+
+                if batch_rows:
+                    result = self._append_batch(table_name, view[:batch_rows * record_size], row_num - batch_rows + 1, row_num)
+                    if result.get("status") == "error":
+                        return result
+
+            # Build indexes once over the loaded data instead of per row
+            index_result = self._initialize_indexes(table_name)
+            if index_result.get("status") == "error":
+                return index_result
 
             return {
                 "status": "success",
@@ -211,6 +324,13 @@ class CreateCommand:
                 "message": str(e)
             }
 
+    def _append_batch(self, table_name: str, buffer: memoryview, first_row: int, last_row: int) -> Dict[str, Any]:
+        """Write a batch of packed CSV rows, naming the rows in the error if it fails"""
+        result = self.table_manager.append_records_bulk(table_name, buffer)
+        if result.get("status") == "error":
+            result["message"] = f"Failed to load rows {first_row}-{last_row}: {result['message']}"
+        return result
+
     def _initialize_indexes(self, table_name: str) -> Dict[str, Any]:
         """Initialize all indexes for a table"""
         table_info = self.table_manager.get_table_info(table_name)
@@ -219,45 +339,26 @@ class CreateCommand:
 
         try:
             # First validate all columns exist before starting any index creation
+            positions = self.table_manager.column_positions(table_info)
             for col in table_info["indexes"].keys():
-                col_info = next(
-                    (c for c in table_info["columns"] if c["name"] == col),
-                    None
-                )
-                if not col_info:
+                if col not in positions:
                     return {"error": f"Column {col} not found in table {table_name}"}
 
-            # Now create and build each index
-            for col, index_type in table_info["indexes"].items():
-                
-                col_idx = next(
-                    (i for i, c in enumerate(table_info["columns"]) if c["name"] == col),
-                    -1
-                )
-                
-                try:
-                    index = None
-                    try:
-                        index = IndexFactory.get_index(
-                            index_type='bplus',  # Currently hardcoded as we only support B+ trees
-                            index_filename=table_info["index_files"][col],
-                            data_filename=table_info["data_file"],
-                            data_format=table_info["format_str"],
-                            key_position=col_idx + 1  # +1 to account for deletion marker
-                        )
-                        
-                        # Build index from existing data
-                        index.build_from_data()
-                    finally:
-                        # Ensure index is properly closed/cleaned up
-                        if index and hasattr(index, 'close'):
-                            index.close()
-                    
-                except Exception as e:
-                    return {
-                        "status": "error",
-                        "message": f"Failed to create index {index_type} for column {col}: {str(e)}"
-                    }
+            # Now build the indexes in parallel: each one writes its own file
+            # and only reads the data file
+            indexes = table_info["indexes"]
+            if indexes:
+                workers = min(MAX_INDEX_BUILD_WORKERS, len(indexes))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [
+                        executor.submit(self._build_index, table_info, col, positions[col], index_type)
+                        for col, index_type in indexes.items()
+                    ]
+                    # Report failures in column order
+                    for future in futures:
+                        error = future.result()
+                        if error:
+                            return error
             
             return {
                 "status": "success",
@@ -270,52 +371,97 @@ class CreateCommand:
                 "message": f"Failed to initialize indexes: {str(e)}"
             }
 
-    def _infer_type(self, value: str) -> str:
-        """Infer column type from value"""
-        # First clean the value by removing thousand separators
-        cleaned_value = value.replace(',', '')
-        
+    def _build_index(self, table_info: Dict[str, Any], col: str, col_idx: int, index_type: str) -> Optional[Dict[str, Any]]:
+        """Build the index of one column from the data file, returning an error dict on failure"""
         try:
-            int(cleaned_value)
-            return 'INT'
-        except ValueError:
+            index = None
             try:
-                float(cleaned_value)
-                return 'FLOAT'
-            except ValueError:
-                if self._is_array_float(value):
-                    return 'ARRAY[FLOAT]'
-                elif self._is_date(value):
-                    return 'DATE'
-                else:
-                    return 'VARCHAR[50]'
+                # Opening the empty index file builds it from the records of the data file
+                index = IndexFactory.get_index(
+                    index_type='bplus',  # Currently hardcoded as we only support B+ trees
+                    index_filename=table_info["index_files"][col],
+                    data_filename=table_info["data_file"],
+                    data_format=table_info["format_str"],
+                    key_position=col_idx + 1  # +1 to account for deletion marker
+                )
+            finally:
+                # Ensure index is properly closed/cleaned up
+                if index and hasattr(index, 'close'):
+                    index.close()
+            
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": f"Failed to create index {index_type} for column {col}: {str(e)}"
+            }
+        return None
+
+    def _infer_columns(self, reader, col_indexes: List[int]) -> Dict[int, Tuple[int, Optional[str]]]:
+        """
+        Longest value in UTF-8 bytes and kind of data (None if there are no values)
+        of each CSV column in col_indexes, over every remaining row of reader.
+        """
+        stats = {col_idx: (0, None) for col_idx in col_indexes}
+        while True:
+            rows = list(itertools.islice(reader, INFERENCE_CHUNK_ROWS))
+            if not rows:
+                return stats
+            for col_idx, (max_len, kind) in stats.items():
+                chunk_len, kind = self._infer_column(rows, col_idx, kind)
+                stats[col_idx] = (max(max_len, chunk_len), kind)
+
+    def _infer_column(self, rows: List[List[str]], col_idx: int,
+                      kind: Optional[str] = None) -> Tuple[int, Optional[str]]:
+        """
+        Longest value in UTF-8 bytes of one CSV column over rows, and kind widened
+        with the kind of data of its values there.
+        """
+        # Work column by column over the distinct values: CSV columns repeat a lot,
+        # and the set/len/max steps run in C. Short rows have no value for the
+        # column, as when the rows were zipped with the headers
+        distinct = {value.strip() for value in {row[col_idx] for row in rows if len(row) > col_idx}}
+        if kind != 'string':
+            kind = self._join_values(kind, distinct)
+        # VARCHARs are sized in bytes, only non-ASCII values need encoding to measure them
+        if all(map(str.isascii, distinct)):
+            max_len = max(map(len, distinct), default=0)
+        else:
+            max_len = max(map(len, map(str.encode, distinct)), default=0)
+        return max_len, kind
+
+    def _join_values(self, kind: Optional[str], values) -> Optional[str]:
+        """Widen kind with the kind of every value"""
+        for value in values:
+            kind = _join_kinds(kind, self._classify_value(value))
+            if kind == 'string':
+                break  # Kinds only ever widen
+        return kind
+
+    def _classify_value(self, value: str) -> str:
+        """Kind of data a single stripped CSV value holds"""
+        if self._is_date(value):
+            return 'date'
+
+        # Clean value of thousand separators
+        clean_val = value.replace(',', '')
+        if _INT_RE.fullmatch(clean_val):
+            return 'int'
+        if _FLOAT_RE.fullmatch(clean_val):
+            return 'float'
+
+        # Check if it's an array of floats
+        if self._is_array_float(value):
+            return 'array'
+        return 'string'
 
     def _is_array_float(self, value: str) -> bool:
         """Check if value is an array of floats (x,y format)"""
-        if ',' not in value:
-            return False
-            
-        # If it has a comma, check if it's just a thousands separator
-        # by looking at the pattern: digits,digits where second part is exactly 3 digits
-        parts = value.split(',')
-        if len(parts) == 2 and len(parts[1].strip()) == 3 and parts[1].strip().isdigit():
-            return False  # This is likely a number with thousand separator
-            
-        # Try to parse both parts as floats
-        try:
-            for part in parts:
-                # Clean each part of thousand separators
-                clean_part = part.strip().replace(',', '')
-                float(clean_part)
-            return True
-        except ValueError:
-            return False
+        return bool(_ARRAY_RE.fullmatch(value)) and not _THOUSANDS_RE.fullmatch(value)
 
     def _is_date(self, value: str) -> bool:
         """Check if value matches date format YYYY-MM-DD"""
-        try:
-            from datetime import datetime
-            datetime.strptime(value, '%Y-%m-%d')
-            return True
-        except ValueError:
-            return False 
\ No newline at end of file
+        match = _DATE_RE.fullmatch(value)
+        if not match:
+            return False
+        year, month, day = map(int, match.groups())
+        return year >= 1 and 1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1] 
\ No newline at end of file
@@ -1,14 +1,13 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 from ..index_handling.index_factory import IndexFactory
-from ..utils.type_converter import TypeConverter
+from ..utils.type_converter import TypeConverter, strip_varchar_prefix
 from ..storage_management.table_manager import TableManager
 from ..storage_management.compaction import TableCompactor
-import struct
 from ..cursors.line_cursor import LineCursor
+import mmap
+import os
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 class DeleteCommand:
@@ -35,10 +34,7 @@ class DeleteCommand:
 
         # Get column info for the filter
         col = filter["column"]
-        col_idx = next(
-            (i for i, c in enumerate(table_info["columns"]) if c["name"] == col),
-            -1
-        )
+        col_idx = self.table_manager.column_positions(table_info).get(col, -1)
         if col_idx == -1:
             logger.error(f"Column {col} not found in table schema")
             return {"status": "error", "message": f"Column {col} not found"}
@@ -67,72 +63,153 @@ class DeleteCommand:
             
             # Prepare search key based on index type
             if index_type.lower() == 'bplus':
-                if isinstance(search_value, int):
-                    search_key = search_value.to_bytes(8, byteorder='little')
-                elif isinstance(search_value, str):
-                    search_key = search_value.encode().ljust(8, b'\x00')
-                elif isinstance(search_value, float):
-                    search_key = struct.pack('=d', search_value)
-                else:
-                    search_key = search_value
+                try:
+                    # The bytes the tree built from the stored field
+                    search_key = TypeConverter.to_index_key(filter["value"], col_type)
+                except ValueError as e:
+                    return {"status": "error", "message": f"Invalid search value: {str(e)}"}
+                # Skips the entries of deleted records, also those never flagged in the index
+                record_pos = index.search_live(search_key)
             else:
                 search_key = search_value
-            
-            record_pos = index.search(search_key)
+                record_pos = index.search(search_key)
         else:
-            logger.error(f"No index available for column {col}")
-            return {"status": "error", "message": f"DELETE requires an index on column {col}"}
+            return self._delete_by_scan(table_name, table_info, col_idx, search_value, filter)
 
         if record_pos is None:
+            # Searches skip the entries of deleted records
+            if index_type.lower() == 'bplus' and index.is_deleted(search_key):
+                return {
+                    "status": "success",
+                    "message": f"Record with {col}={filter['value']} was already deleted"
+                }
             return {
                 "status": "error",
                 "message": f"Record with {col}={filter['value']} not found"
             }
 
-        # Read the record to get all field values
-        record_size = struct.calcsize(table_info["format_str"])
-        cursor = LineCursor(table_info["data_file"], record_size)
-        
         try:
-            with cursor as c:
-                # Read the record
-                c.goto_record(record_pos)
-                record = c.read_record()
-                if not record:
-                    logger.error("Could not read record")
-                    return {"status": "error", "message": "Could not read record"}
-                
-                # Extract all field values from the record
-                record_values = struct.unpack(table_info["format_str"], record)
-                
-                # Check if already deleted (first byte is deletion marker)
-                if record_values[0] == b'\x01':  # Marker for deleted
-                    return {
-                        "status": "success",
-                        "message": f"Record with {col}={filter['value']} was already deleted"
-                    }
-                
-                # Mark record as deleted by setting deletion marker
-                new_record = b'\x01' + record[1:]  # Set deletion marker to 1
-                c.overwrite_current(new_record)
-                
-                # Update table stats
-                self.table_manager.update_table_stats(table_name, deleted_delta=1)
-                
-                # Check if table should be compacted
-                if self.table_manager.should_compact(table_name):
-                    compaction_result = self.compactor.compact_table(table_name)
-                    if compaction_result.get("status") == "error":
-                        logger.error(f"Compaction failed: {compaction_result.get('message')}")
-                
+            # Only the marker byte is read and written, the rest of the record is untouched
+            marked = self.table_manager.mark_deleted(table_info, record_pos)
+            if marked is None:
+                logger.error("Could not read record")
+                return {"status": "error", "message": "Could not read record"}
+            if not marked:
                 return {
                     "status": "success",
-                    "message": f"Record with {col}={filter['value']} deleted successfully"
+                    "message": f"Record with {col}={filter['value']} was already deleted"
                 }
+
+            if index_type.lower() == 'bplus':
+                index.mark_deleted(search_key, record_pos)
+            if col != table_info.get("primary_key"):
+                with LineCursor(table_info["data_file"], self.table_manager.record_struct(table_info).size) as c:
+                    c.goto_record(record_pos)
+                    self._mark_primary_key_deleted(table_info, [(record_pos, c.read_record())])
+
+            # Update table stats
+            self.table_manager.update_table_stats(table_name, deleted_delta=1)
+            
+            # Check if table should be compacted
+            if self.table_manager.should_compact(table_name):
+                compaction_result = self.compactor.compact_table(table_name)
+                if compaction_result.get("status") == "error":
+                    logger.error(f"Compaction failed: {compaction_result.get('message')}")
+            
+            return {
+                "status": "success",
+                "message": f"Record with {col}={filter['value']} deleted successfully"
+            }
                 
         except Exception as e:
             logger.error(f"Error during delete: {str(e)}")
             return {
                 "status": "error",
                 "message": f"Failed to delete record: {str(e)}"
-            } 
\ No newline at end of file
+            }
+
+    def _delete_by_scan(self, table_name: str, table_info: Dict[str, Any], col_idx: int,
+                        search_value: Any, filter: Dict[str, Any]) -> Dict[str, Any]:
+        """Delete every live record whose column equals search_value when the column has no index"""
+        col = filter["column"]
+        record_size = self.table_manager.record_struct(table_info).size
+        key_offset, field_struct = self.table_manager.column_layout(table_info, col_idx)
+        field_end = key_offset + field_struct.size
+        if table_info["columns"][col_idx]["type"].startswith("VARCHAR"):
+            # Values loaded from CSV by older versions follow a row number prefix:
+            # look for the text anywhere in the field and compare it without the prefix
+            needle = search_value.rstrip(b'\x00')
+            matches = lambda field: strip_varchar_prefix(field).rstrip(b'\x00') == needle
+        else:
+            # Fixed-width fields are stored exactly as packed
+            values = search_value if isinstance(search_value, tuple) else (search_value,)
+            needle = field_struct.pack(*values)
+            matches = None
+
+        deleted = []
+        try:
+            with open(table_info["data_file"], 'r+b') as f:
+                size = os.fstat(f.fileno()).st_size
+                end = size - size % record_size
+                if end:
+                    with mmap.mmap(f.fileno(), 0) as mm:
+                        # mmap.find scans in C; a hit only counts when it lands on the
+                        # column of some record, otherwise resume at the next record's column
+                        start = key_offset
+                        while start < end:
+                            hit = mm.find(needle, start, end)
+                            if hit < 0:
+                                break
+                            record_start = hit - hit % record_size
+                            offset = hit - record_start
+                            if offset < key_offset:
+                                start = record_start + key_offset
+                                continue
+                            if offset + len(needle) <= field_end and (
+                                    offset == key_offset if matches is None
+                                    else matches(mm[record_start + key_offset:record_start + field_end])):
+                                if mm[record_start] == 0:  # Not deleted yet
+                                    mm[record_start] = 1
+                                    deleted.append((record_start // record_size,
+                                                    mm[record_start:record_start + record_size]))
+                            start = record_start + record_size + key_offset
+                        mm.flush()
+            self._mark_primary_key_deleted(table_info, deleted)
+        except Exception as e:
+            logger.error(f"Error during delete: {str(e)}")
+            return {
+                "status": "error",
+                "message": f"Failed to delete record: {str(e)}"
+            }
+
+        if not deleted:
+            return {
+                "status": "error",
+                "message": f"Record with {col}={filter['value']} not found"
+            }
+
+        self.table_manager.update_table_stats(table_name, deleted_delta=len(deleted))
+        if self.table_manager.should_compact(table_name):
+            compaction_result = self.compactor.compact_table(table_name)
+            if compaction_result.get("status") == "error":
+                logger.error(f"Compaction failed: {compaction_result.get('message')}")
+
+        return {
+            "status": "success",
+            "message": f"{len(deleted)} record(s) with {col}={filter['value']} deleted successfully"
+        }
+
+    def _mark_primary_key_deleted(self, table_info: Dict[str, Any], records: List[Tuple[int, bytes]]) -> None:
+        """Flag deleted (position, record) pairs in the primary key index, which INSERT trusts for duplicates"""
+        primary_key = table_info.get("primary_key")
+        if not primary_key or table_info["indexes"].get(primary_key, "").lower() != 'bplus':
+            return
+        index = IndexFactory.get_index(
+            index_type='bplus',
+            index_filename=table_info["index_files"][primary_key],
+            data_filename=table_info["data_file"],
+            data_format=table_info["format_str"],
+            key_position=self.table_manager.column_positions(table_info)[primary_key] + 1  # +1 to account for deletion marker
+        )
+        for record_pos, record in records:
+            index.mark_deleted(index._extract_key(record), record_pos)
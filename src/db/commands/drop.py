@@ -3,6 +3,7 @@ import os
 import shutil
 import logging
 from ..storage_management.table_manager import TableManager
+from ..index_handling.index_factory import IndexFactory
 
 logger = logging.getLogger(__name__)
 
@@ -51,8 +52,9 @@ class DropCommand:
             
             # Remove the entire table directory
             if os.path.exists(table_dir):
-                shutil.rmtree(table_dir)
-                logger.debug(f"Successfully dropped table {table_name}")
+                IndexFactory.forget(*table_info.get("index_files", {}).values())
+                self._remove_table_dir(table_dir)
+                logger.debug("Successfully dropped table %s", table_name)
                 return {
                     "status": "success",
                     "message": f"Table {table_name} dropped successfully"
@@ -68,4 +70,14 @@ class DropCommand:
             return {
                 "status": "error",
                 "message": f"Failed to drop table: {str(e)}"
-            } 
\ No newline at end of file
+            }
+
+    def _remove_table_dir(self, table_dir: str) -> None:
+        """Remove a table directory, unlinking its files directly (tables hold only flat files)"""
+        with os.scandir(table_dir) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.unlink(entry.path)
+        os.rmdir(table_dir)
@@ -1,9 +1,17 @@
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import Dict, Any, List, Optional
 from ..storage_management.table_manager import TableManager
 from ..index_handling.index_factory import IndexFactory
+from ..index_handling.implementations import BPlusTreeIndex
 from ..utils.type_converter import TypeConverter
-from ..cursors.line_cursor import LineCursor
-import struct
+
+# Threads shared by all inserts to update a table's secondary indexes
+MAX_INDEX_UPDATE_WORKERS = 8
+_index_pool = ThreadPoolExecutor(max_workers=MAX_INDEX_UPDATE_WORKERS)
+
+# Rows an InsertCursor buffers before writing them as one batch
+INSERT_CURSOR_BUFFER_ROWS = 4096
 
 class InsertCommand:
     def __init__(self, table_manager: TableManager):
@@ -23,11 +31,13 @@ class InsertCommand:
             }
             
         # Convert values to binary record
+        record_struct = self.table_manager.record_struct(table_info)
         try:
             record = TypeConverter.convert_record(
                 values=values,
                 columns=table_info["columns"],
-                format_str=table_info["format_str"]
+                format_str=table_info["format_str"],
+                record_struct=record_struct
             )
         except Exception as e:
             return {
@@ -36,13 +46,12 @@ class InsertCommand:
             }
             
         # Check primary key constraint
+        positions = self.table_manager.column_positions(table_info)
         primary_key = table_info.get("primary_key")
+        new_last_pk = None
         if primary_key:
             # Get primary key value and position
-            pk_idx = next(
-                (i for i, c in enumerate(table_info["columns"]) if c["name"] == primary_key),
-                -1
-            )
+            pk_idx = positions.get(primary_key, -1)
             if pk_idx == -1:
                 return {
                     "status": "error",
@@ -59,79 +68,55 @@ class InsertCommand:
                     "message": f"Primary key {primary_key} must have a B+ tree index"
                 }
 
-            # Use index to check if key exists
-            index = IndexFactory.get_index(
-                index_type='bplus',
-                index_filename=table_info["index_files"][primary_key],
-                data_filename=table_info["data_file"],
-                data_format=table_info["format_str"],
-                key_position=pk_idx + 1  # +1 to account for deletion marker
-            )
-            
-            # Convert value to appropriate type for search
-            search_key = TypeConverter.convert_value(pk_value, pk_type)
+            # Use index to check if key exists, the same index then takes the new record
+            primary_index = self._open_index(table_info, primary_key, pk_idx, 'bplus')
             
-            # Convert search key to bytes for B+ tree search
-            if isinstance(search_key, int):
-                search_key = search_key.to_bytes(8, byteorder='little')
-            elif isinstance(search_key, str):
-                search_key = search_key.encode().ljust(8, b'\x00')
-            elif isinstance(search_key, bytes):
-                search_key = search_key[:8].ljust(8, b'\x00')
-            
-            # Search in index - if we find ANY record, it's a duplicate
-            result = index.search(search_key)
-            if result is not None:
-                # Check if the found record is not deleted
-                cursor = LineCursor(table_info["data_file"], struct.calcsize(table_info["format_str"]))
-                with cursor as c:
-                    c.goto_record(result)
-                    found_record = c.read_record()
-                    if found_record and found_record[0] == b'\x00'[0]:  # Not deleted
-                        return {
-                            "status": "error",
-                            "message": f"Record with {primary_key}={pk_value} already exists"
-                        }
+            # Convert value to appropriate type
+            pk_converted = TypeConverter.convert_value(pk_value, pk_type)
+
+            # A key above every key of a MONOTONIC table cannot be a duplicate
+            if table_info.get("pk_monotonic"):
+                new_last_pk = pk_converted
+            if not self._above_last_pk(table_info, pk_converted):
+                # Search in index - deleted records are flagged in it, or marked in the data file
+                result = primary_index.search_live(primary_index._extract_key(record))
+                if result is not None:
+                    return {
+                        "status": "error",
+                        "message": f"Record with {primary_key}={pk_value} already exists"
+                    }
 
         # Write record to data file and update indexes
         try:
             # Write record to data file using primary key index
-            primary_index = IndexFactory.get_index(
-                index_type='bplus',
-                index_filename=table_info["index_files"][primary_key],
-                data_filename=table_info["data_file"],
-                data_format=table_info["format_str"],
-                key_position=pk_idx + 1  # +1 to account for deletion marker
-            )
-            primary_index.add(record)
+            position = primary_index.add(record)
             
             # Update remaining indexes (excluding primary key)
-            remaining_indexes = {k: v for k, v in table_info["indexes"].items() if k != primary_key}
-            for col, index_type in remaining_indexes.items():
-                col_idx = next(
-                    (i for i, c in enumerate(table_info["columns"]) if c["name"] == col),
-                    -1
-                )
+            remaining_indexes = []
+            for col, index_type in table_info["indexes"].items():
+                if col == primary_key:
+                    continue
+                col_idx = positions.get(col, -1)
                 if col_idx == -1:
                     raise Exception(f"Column {col} not found in table schema")
+                remaining_indexes.append((col, col_idx, index_type))
 
-                # Create appropriate index instance based on type
-                index = IndexFactory.get_index(
-                    index_type=index_type.lower(),  # Ensure lowercase for consistency
-                    index_filename=table_info["index_files"][col],
-                    data_filename=table_info["data_file"],
-                    data_format=table_info["format_str"],
-                    key_position=col_idx + 1  # +1 to account for deletion marker
-                )
-                
-                # Add record to index
-                try:
-                    index.add(record)
-                except Exception as e:
-                    raise Exception(f"Failed to update {index_type} index for column {col}: {str(e)}")
+            if len(remaining_indexes) == 1:
+                self._add_to_index(table_info, *remaining_indexes[0], record, position)
+            elif remaining_indexes:
+                # Each index writes only its own files, so they are updated in parallel
+                futures = [
+                    _index_pool.submit(self._add_to_index, table_info, col, col_idx, index_type, record, position)
+                    for col, col_idx, index_type in remaining_indexes
+                ]
+                # Wait for all of them, then report failures in column order
+                errors = [future.exception() for future in futures]
+                for error in errors:
+                    if error:
+                        raise error
 
             # Update table stats
-            self.table_manager.update_table_stats(table_name, total_delta=1)
+            self.table_manager.update_table_stats(table_name, total_delta=1, last_pk=new_last_pk)
 
             return {
                 "status": "success",
@@ -143,28 +128,205 @@ class InsertCommand:
                 "message": f"Failed to update indexes: {str(e)}"
             }
 
-    def _update_indexes(self, table_info: Dict[str, Any], record: bytes) -> None:
-        """Update all indexes for the table with the new record"""
-        for col, index_file in table_info["index_files"].items():
-            try:
-                # Get column position
-                col_idx = next(
-                    (i for i, c in enumerate(table_info["columns"]) if c["name"] == col),
-                    -1
-                )
-                
-                if col_idx == -1:
-                    raise Exception(f"Column {col} not found in table schema")
+    @staticmethod
+    def _above_last_pk(table_info: Dict[str, Any], pk_value: Any) -> bool:
+        """True if the table is MONOTONIC and pk_value is larger than every primary key inserted so far"""
+        if not table_info.get("pk_monotonic"):
+            return False
+        last_pk = table_info["stats"].get("last_pk")
+        return last_pk is None or pk_value > last_pk
 
-                index = IndexFactory.get_index(
-                    index_type='bplus',  # Currently hardcoded as we only support B+ trees
-                    index_filename=index_file,
-                    data_filename=table_info["data_file"],
-                    data_format=table_info["format_str"],
-                    key_position=col_idx
-                )
-                
-                # Add record to index
+    @staticmethod
+    def _open_index(table_info: Dict[str, Any], col: str, col_idx: int, index_type: str):
+        """Create the index instance of a column"""
+        return IndexFactory.get_index(
+            index_type=index_type.lower(),  # Ensure lowercase for consistency
+            index_filename=table_info["index_files"][col],
+            data_filename=table_info["data_file"],
+            data_format=table_info["format_str"],
+            key_position=col_idx + 1  # +1 to account for deletion marker
+        )
+
+    def _add_to_index(self, table_info: Dict[str, Any], col: str, col_idx: int, index_type: str,
+                      record: bytes, position: int) -> None:
+        """Add an inserted record to the index of one column"""
+        index = self._open_index(table_info, col, col_idx, index_type)
+
+        # Add record to index, B+ trees only need its key and position
+        # (their add() would append the record to the data file again)
+        try:
+            if isinstance(index, BPlusTreeIndex):
+                index.insert_key_and_position(index._extract_key(record), position)
+            else:
                 index.add(record)
+        except Exception as e:
+            raise Exception(f"Failed to update {index_type} index for column {col}: {str(e)}")
+
+    def execute_many(self, parsed_queries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Execute several INSERT commands on one table as a batch: the records are
+        appended with a single write and each index gets one sorted batch insert.
+        Nothing is written if any row is invalid or duplicates a primary key.
+        """
+        if not parsed_queries:
+            return {
+                "status": "success",
+                "message": "0 record(s) inserted successfully"
+            }
+
+        table_name = parsed_queries[0]["table_name"]
+        if any(q["table_name"].lower() != table_name.lower() for q in parsed_queries):
+            return {
+                "status": "error",
+                "message": "All queries in a batch insert must target the same table"
+            }
+
+        table_info = self.table_manager.get_table_info(table_name)
+        if not table_info:
+            return {
+                "status": "error",
+                "message": f"Table {table_name} not found"
+            }
+
+        # Pack every record into one preallocated buffer, the same bytes that get appended
+        record_struct = self.table_manager.record_struct(table_info)
+        record_size = record_struct.size
+        buffer = bytearray(record_size * len(parsed_queries))
+        for row_num, parsed_query in enumerate(parsed_queries, start=1):
+            try:
+                TypeConverter.pack_record_into(
+                    values=parsed_query["values"],
+                    columns=table_info["columns"],
+                    record_struct=record_struct,
+                    buffer=buffer,
+                    offset=(row_num - 1) * record_size
+                )
             except Exception as e:
-                raise Exception(f"Failed to update index for column {col}: {str(e)}") 
\ No newline at end of file
+                return {
+                    "status": "error",
+                    "message": f"Invalid values in row {row_num}: {str(e)}"
+                }
+        rows = list(record_struct.iter_unpack(buffer))
+
+        positions = self.table_manager.column_positions(table_info)
+        indexes = {}
+        for col, index_type in table_info["indexes"].items():
+            col_idx = positions.get(col, -1)
+            if col_idx == -1:
+                return {
+                    "status": "error",
+                    "message": f"Column {col} not found in table schema"
+                }
+            indexes[col] = self._open_index(table_info, col, col_idx, index_type)
+
+        # Check primary key constraint, within the batch and against the table
+        primary_key = table_info.get("primary_key")
+        new_last_pk = None
+        if primary_key:
+            primary_index = indexes.get(primary_key)
+            if not isinstance(primary_index, BPlusTreeIndex):
+                return {
+                    "status": "error",
+                    "message": f"Primary key {primary_key} must have a B+ tree index"
+                }
+
+            pk_keys = [primary_index._key_from_values(row) for row in rows]
+            seen = set()
+            for row_num, key in enumerate(pk_keys):
+                if key in seen:
+                    pk_value = parsed_queries[row_num]["values"][positions[primary_key]]
+                    return {
+                        "status": "error",
+                        "message": f"Record with {primary_key}={pk_value} appears more than once"
+                    }
+                seen.add(key)
+
+            # Fields are unpacked with the deletion marker first
+            pk_values = [row[positions[primary_key] + 1] for row in rows]
+            if table_info.get("pk_monotonic"):
+                new_last_pk = max(pk_values)
+            existing = {}
+            if not self._above_last_pk(table_info, min(pk_values)):
+                existing = primary_index.search_many(sorted(seen))
+                # Entries deleted before DELETE flagged them only count if the record is live
+                existing = {key: ptr for key, ptr in existing.items()
+                            if primary_index.search_live(key) is not None}
+            for row_num, key in enumerate(pk_keys):
+                if key in existing:
+                    pk_value = parsed_queries[row_num]["values"][positions[primary_key]]
+                    return {
+                        "status": "error",
+                        "message": f"Record with {primary_key}={pk_value} already exists"
+                    }
+
+        try:
+            result = self.table_manager.append_records_bulk(table_name, buffer)
+            if result["status"] != "success":
+                return result
+            first_pos = result["offset"] // record_size
+
+            for col, index in indexes.items():
+                try:
+                    if isinstance(index, BPlusTreeIndex):
+                        # Sorted by key only, so equal keys keep their insertion order
+                        entries = sorted(
+                            ((index._key_from_values(row), first_pos + i) for i, row in enumerate(rows)),
+                            key=itemgetter(0)
+                        )
+                        index.add_sorted(entries)
+                    else:
+                        for start in range(0, len(buffer), record_size):
+                            index.add(bytes(buffer[start:start + record_size]))
+                except Exception as e:
+                    raise Exception(f"Failed to update {table_info['indexes'][col]} index for column {col}: {str(e)}")
+
+            self.table_manager.update_table_stats(table_name, total_delta=len(rows), last_pk=new_last_pk)
+
+            return {
+                "status": "success",
+                "message": f"{len(rows)} record(s) inserted successfully"
+            }
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": f"Failed to update indexes: {str(e)}"
+            }
+
+
+class InsertCursor:
+    """
+    Buffer rows for one table and insert them in batches, like an insert cursor's
+    PUT / FLUSH / CLOSE: each flush is a single InsertCommand.execute_many call, so the
+    records are appended with one write and every index gets one sorted batch insert.
+    """
+    def __init__(self, table_manager: TableManager, table_name: str,
+                 buffer_size: int = INSERT_CURSOR_BUFFER_ROWS):
+        self.command = InsertCommand(table_manager)
+        self.table_name = table_name
+        self.buffer_size = buffer_size
+        self._rows = []
+
+    def put(self, values: List[Any]) -> Optional[Dict[str, Any]]:
+        """Buffer a row, returning the flush result when the buffer fills up (None otherwise)"""
+        self._rows.append({"table_name": self.table_name, "values": values})
+        if len(self._rows) >= self.buffer_size:
+            return self.flush()
+        return None
+
+    def flush(self) -> Dict[str, Any]:
+        """Insert the buffered rows; the batch is all or nothing, and the buffer is emptied either way"""
+        rows, self._rows = self._rows, []
+        return self.command.execute_many(rows)
+
+    def close(self) -> Dict[str, Any]:
+        """Insert whatever is still buffered"""
+        return self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            result = self.close()
+            if result["status"] == "error":
+                raise Exception(result["message"])
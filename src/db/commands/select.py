@@ -1,32 +1,19 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable, Optional
 from ..cursors.line_cursor import LineCursor
 from ..index_handling.index_factory import IndexFactory
-from ..utils.type_converter import TypeConverter
+from ..utils.type_converter import TypeConverter, strip_varchar_prefix
 from ..storage_management.table_manager import TableManager
-import struct
 import logging
+import numpy as np
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+_SUPPORTED_INDEXES = frozenset({"bplus", "hash", "sequential", "isam", "rtree"})
+
 class SelectCommand:
     def __init__(self, table_manager: TableManager):
         self.table_manager = table_manager
     
-    def _prepare_search_key(self, key: Any, col_type: str) -> bytes:
-        """Convert a key to the proper byte format for index searching"""
-        if isinstance(key, int):
-            return key.to_bytes(8, byteorder='little')
-        elif isinstance(key, str):
-            return key.encode().ljust(8, b'\x00')
-        elif isinstance(key, bytes):
-            return key[:8].ljust(8, b'\x00')
-        elif isinstance(key, float):
-            return struct.pack('=d', key)  # 8-byte double
-        else:
-            raise ValueError(f"Unsupported key type for index: {type(key)}")
-    
     def execute(self, parsed_query: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a SELECT query"""
         table_name = parsed_query["table_name"]
@@ -38,16 +25,19 @@ class SelectCommand:
             raise Exception(f"Table {table_name} not found")
             
             
-        # Create cursor for this operation with just filename and record size
-        record_size = struct.calcsize(table_info["format_str"])
-        cursor = LineCursor(table_info["data_file"], record_size)
-        
-        # Check if we have any indexes available
-        available_indexes = table_info.get("indexes", {})
+        # Create cursor for this operation with the compiled record format
+        record_struct = self.table_manager.record_struct(table_info)
+        cursor = LineCursor(table_info["data_file"], record_struct.size, record_struct)
         
         # Get records based on query type
         if "filters" in parsed_query and parsed_query["filters"]:
-            records = self._get_filtered_records(cursor, table_info, parsed_query["filters"][0])
+            filter = parsed_query["filters"][0]
+            if self._is_key_lookup(table_info, filter):
+                records = self._get_records_with_index(table_info, cursor, filter)
+            elif self._is_range_lookup(table_info, filter):
+                records = self._get_records_in_range(table_info, cursor, filter)
+            else:
+                records = self._get_filtered_records(cursor, table_info, filter)
         else:
             records = self._get_all_records(cursor, table_info)
             
@@ -61,171 +51,218 @@ class SelectCommand:
     
     def _get_all_records(self, cursor: LineCursor, table_info: Dict[str, Any]) -> List[List[Any]]:
         """Get all records from the table by reading sequentially"""
-        records = []
+        record_struct = self.table_manager.record_struct(table_info)
+        decode = TypeConverter.compile_record_decoder(table_info["columns"])
         with cursor as c:
-            # Get total number of records
-            total = c.total_records()
-            
-            # Read each record
-            for i in range(total):
-                c.goto_record(i)
-                raw_record = c.read_record()
-                if raw_record:
-                    # Check deletion marker (first byte)
-                    if raw_record[0] == b'\x00'[0]:  # Not deleted
-                        # Convert raw bytes to Python values
-                        record = TypeConverter.bytes_to_values(
-                            raw_record, 
-                            table_info["format_str"],
-                            table_info["columns"]
-                        )
-                        records.append(record)
-        return records
+            return [decode(values) for values in c.scan_live(record_struct)]
     
+    def _is_key_lookup(self, table_info: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+        """
+        Whether the filter is an equality on the primary key, which its B+ tree answers
+        with one search. Everything else is scanned. An index file that is missing or
+        was written before the current key format is built from the data file on open.
+        """
+        col = filter.get("column")
+        return (filter.get("operation") == "="
+                and col == table_info.get("primary_key")
+                and self._select_index_type(table_info, col, filter) == "bplus")
+
     def _get_records_with_index(self, table_info: Dict[str, Any], cursor: LineCursor, filter: Dict[str, Any]) -> List[List[Any]]:
-        """Get records using an index"""
+        """Get the records matching an equality filter on the primary key through its index"""
         col = filter["column"]
         
         # Get column position and type
-        col_idx = next(
-            (i for i, c in enumerate(table_info["columns"]) if c["name"] == col),
-            -1
-        )
+        col_idx = self.table_manager.column_positions(table_info).get(col, -1)
         if col_idx == -1:
             return []
             
         col_type = table_info["columns"][col_idx]["type"]
-        
-        # Determine which index to use
-        index_type = self._select_index_type(table_info, col, filter)
-        logger.debug(f"Index type: {index_type}")
-        if not index_type:
-            return self._get_all_records(cursor, table_info)
-            
-        logger.debug(f"Selected index type {index_type} for column {col}")
-        index_file = table_info["index_files"][col]
-        
-        # Create the index
+        try:
+            target = TypeConverter.to_field_value(filter["value"], col_type)
+            key = TypeConverter.to_index_key(filter["value"], col_type)
+        except ValueError:
+            # Operands without a key are compared as text by the scan
+            return self._get_filtered_records(cursor, table_info, filter)
+
         index = IndexFactory.get_index(
-            index_type=index_type,
-            index_filename=index_file,
+            index_type="bplus",
+            index_filename=table_info["index_files"][col],
             data_filename=table_info["data_file"],
             data_format=table_info["format_str"],
-            key_position=col_idx
+            key_position=col_idx + 1  # +1 to account for deletion marker
         )
-        
-        # Keep cursor open for all operations
+        matches = self._compile_field_filter([target])
+        decode = TypeConverter.compile_record_decoder(table_info["columns"])
+        records = []
         with cursor as c:
-            records = []
-            
-            if filter["operation"] == "=":
-                key = TypeConverter.to_index_key(filter["value"], col_type)
-                result = index.search(key)
-                if result is not None:
-                    raw_record = c.read_at(result)
-                    if raw_record and raw_record[0] == b'\x00'[0]:  # Not deleted
-                        record = TypeConverter.bytes_to_values(
-                            raw_record,
-                            table_info["format_str"],
-                            table_info["columns"]
-                        )
-                        records.append(record)
-            elif filter["operation"] == "BETWEEN":
-                low_key = TypeConverter.to_index_key(filter["from"], col_type)
-                high_key = TypeConverter.to_index_key(filter["to"], col_type)
-                positions = index.range_search(low_key, high_key)
-                for pos in positions:
-                    raw_record = c.read_at(pos)
-                    if raw_record and raw_record[0] == b'\x00'[0]:  # Not deleted
-                        record = TypeConverter.bytes_to_values(
-                            raw_record,
-                            table_info["format_str"],
-                            table_info["columns"]
-                        )
-                        records.append(record)
-            elif filter["operation"] == "SCAN":
-                # Full table scan using B+ tree index
-                total = c.total_records()
-                for i in range(total):
-                    raw_record = c.read_at(i)
-                    if raw_record and raw_record[0] == b'\x00'[0]:  # Not deleted
-                        record = TypeConverter.bytes_to_values(
-                            raw_record,
-                            table_info["format_str"],
-                            table_info["columns"]
-                        )
-                        records.append(record)
-            
-            return records
+            # Tables loaded from CSV files can repeat a primary key, and keys are cut
+            # to 8 bytes, so every entry is read and the field itself must match too
+            for position in index.search_all(key):
+                values = c.read_values_at(position)
+                if values and values[0] == b'\x00' and matches(values[col_idx + 1]):
+                    records.append(decode(values))
+        return records
     
+    def _is_range_lookup(self, table_info: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+        """Whether the filter is a BETWEEN on a column with a B+ tree, which walks its leaves from the lower bound"""
+        return (filter.get("operation") == "BETWEEN"
+                and self._select_index_type(table_info, filter.get("column"), filter) == "bplus")
+
+    def _get_records_in_range(self, table_info: Dict[str, Any], cursor: LineCursor, filter: Dict[str, Any]) -> List[List[Any]]:
+        """Get the records matching a BETWEEN filter through the column's B+ tree, in key order"""
+        col = filter["column"]
+        col_idx = self.table_manager.column_positions(table_info).get(col, -1)
+        if col_idx == -1:
+            return []
+
+        col_type = table_info["columns"][col_idx]["type"]
+        operands = [filter["from"].strip('\'"'), filter["to"].strip('\'"')]
+        try:
+            targets = [TypeConverter.to_field_value(operand, col_type) for operand in operands]
+            begin, end = [TypeConverter.to_index_key(operand, col_type) for operand in operands]
+        except ValueError:
+            # Operands without a key are compared as text by the scan
+            return self._get_filtered_records(cursor, table_info, filter)
+
+        index = IndexFactory.get_index(
+            index_type="bplus",
+            index_filename=table_info["index_files"][col],
+            data_filename=table_info["data_file"],
+            data_format=table_info["format_str"],
+            key_position=col_idx + 1  # +1 to account for deletion marker
+        )
+        positions = index.range_search(begin, end)
+        matches = self._compile_field_filter(targets)
+        decode = TypeConverter.compile_record_decoder(table_info["columns"])
+        with cursor as c:
+            # Read in file order, a run of neighbouring records at a time, and returned in key order
+            found = c.read_records(positions)
+        records = []
+        # Keys are cut to 8 bytes, the field itself decides at the ends of the range
+        for values in found:
+            if values and values[0] == b'\x00' and matches(values[col_idx + 1]):
+                records.append(decode(values))
+        return records
+
+    def _compile_field_filter(self, targets: List[Any]) -> Callable[[Any], bool]:
+        """
+        Build the predicate an unpacked field must pass for an equality (one target) or a
+        BETWEEN (two targets), the targets converted by TypeConverter.to_field_value.
+        """
+        if isinstance(targets[0], bytes):
+            # VARCHARs loaded from CSV by older versions follow a row number prefix
+            targets = [target.rstrip(b'\x00') for target in targets]
+            value = lambda field: strip_varchar_prefix(field).rstrip(b'\x00')
+        else:
+            value = lambda field: field
+        if len(targets) == 1:
+            target = targets[0]
+            return lambda field: value(field) == target
+        low, high = targets
+        return lambda field: low <= value(field) <= high
+
     def _select_index_type(self, table_info: Dict[str, Any], column: str, filter: Dict[str, Any]) -> str:
         """Select the appropriate index type based on the rules"""
-        logger.debug(f"Selecting index type for column {column}")
-        logger.debug(f"Available indexes: {table_info['indexes']}")
+        logger.debug("Selecting index type for column %s", column)
+        logger.debug("Available indexes: %s", table_info['indexes'])
         
         # If column is primary key and no explicit index requested, use B+ tree
         if column == table_info.get("primary_key") and not filter.get("requested_index"):
-            logger.debug(f"Using B+ tree index for primary key {column}")
+            logger.debug("Using B+ tree index for primary key %s", column)
             return "bplus"
             
         # If explicit index type requested, use it if available
         if filter.get("requested_index") and table_info["indexes"].get(column) == filter["requested_index"]:
-            logger.debug(f"Using explicitly requested index type {filter['requested_index']} for {column}")
+            logger.debug("Using explicitly requested index type %s for %s", filter['requested_index'], column)
             return filter["requested_index"]
             
-        # For indexed attributes, follow the priority order
-        if column in table_info["indexes"]:
-            index_type = table_info["indexes"][column]
-            if index_type == "bplus":
-                return "bplus"
-            elif index_type == "hash":
-                return "hash"
-            elif index_type == "sequential":
-                return "sequential"
-            elif index_type == "isam":
-                return "isam"
-            elif index_type == "rtree":
-                return "rtree"
-                
-        return None
+        # For indexed attributes, use the column's index if it is a supported type
+        index_type = table_info["indexes"].get(column)
+        return index_type if index_type in _SUPPORTED_INDEXES else None
 
     def _get_filtered_records(self, cursor: LineCursor, table_info: Dict[str, Any], filter: Dict[str, Any]) -> List[List[Any]]:
         """Get records applying filter without using an index"""
-        records = []
         col = filter["column"]
-        operation = filter["operation"]
         
         # Get column info
-        col_idx = next(
-            (i for i, c in enumerate(table_info["columns"]) if c["name"] == col),
-            -1
-        )
+        col_idx = self.table_manager.column_positions(table_info).get(col, -1)
         if col_idx == -1:
             return []
-            
-        col_type = table_info["columns"][col_idx]["type"]
-        
+
+        operation = filter["operation"]
+        if operation == "=":
+            operands = [str(filter["value"])]
+        elif operation == "BETWEEN":
+            operands = [filter["from"].strip('\'"'), filter["to"].strip('\'"')]
+        else:
+            return []
+
+        columns = table_info["columns"]
+        col_type = columns[col_idx]["type"]
+        record_struct = self.table_manager.record_struct(table_info)
+        decode = TypeConverter.compile_record_decoder(columns)
+        try:
+            targets = [TypeConverter.to_field_value(operand, col_type) for operand in operands]
+        except ValueError:
+            targets = None
+
         with cursor as c:
-            total = c.total_records()
-            
-            for i in range(total):
-                c.goto_record(i)
-                raw_record = c.read_record()
-                if raw_record:
-                    record = TypeConverter.bytes_to_values(
-                        raw_record,
-                        table_info["format_str"],
-                        table_info["columns"]
-                    )
-                    
-                    # Apply filter
-                    if operation == "=":
-                        if str(record[col_idx]) == str(filter["value"]):
-                            records.append(record)
-                    elif operation == "BETWEEN":
-                        from_val = filter["from"].strip('"')
-                        to_val = filter["to"].strip('"')
-                        if from_val <= str(record[col_idx]) <= to_val:
-                            records.append(record)
-                            
-        return records
+            if targets is not None:
+                # The column is compared a whole chunk at a time, only matching records are unpacked
+                where = self._compile_mask(operation, targets, self.table_manager.record_dtype(table_info), col)
+                return [decode(values) for values in c.scan_live(record_struct, where)]
+
+            matches = self._compile_text_filter(operation, operands, columns, col_idx)
+            return [decode(values) for values in c.scan_live(record_struct) if matches(values)]
+
+    def _compile_mask(self, operation: str, targets: List[Any], record_dtype: np.dtype,
+                      col: str) -> Callable[[np.ndarray], np.ndarray]:
+        """
+        Build where(rows) for LineCursor.scan_live: it views a chunk of records with the
+        table's record dtype and compares column col against the targets, which are
+        already converted to the values the field unpacks to.
+        """
+        kind = record_dtype[col].kind
+        if kind == 'S':
+            targets = [np.bytes_(t) for t in targets]
+        elif kind == 'f':
+            targets = [np.float64(t) for t in targets]
+        else:
+            # Wide scalars so targets outside the field's range compare instead of overflowing
+            targets = [np.int64(max(min(t, 2**63 - 1), -2**63)) for t in targets]
+
+        def field(rows: np.ndarray) -> np.ndarray:
+            return rows.view(record_dtype)[:, 0][col]
+
+        if operation == "=":
+            target = targets[0]
+            compare = lambda values: values == target
+        else:
+            low, high = targets
+            compare = lambda values: (values >= low) & (values <= high)
+        if kind != 'S':
+            return lambda rows: compare(field(rows))
+
+        def text(rows: np.ndarray) -> np.ndarray:
+            values = field(rows)
+            mask = compare(values)
+            # VARCHARs loaded from CSV by older versions start with four null bytes and
+            # the row number. NumPy drops trailing nulls, so their first four bytes read
+            # as empty: those rows are compared again without the prefix
+            legacy = np.flatnonzero(values.astype('S4') == b'')
+            legacy = legacy[values[legacy] != b'']
+            if legacy.size:
+                stripped = np.array([strip_varchar_prefix(v) for v in values[legacy]], dtype=values.dtype)
+                mask[legacy] = compare(stripped)
+            return mask
+        return text
+
+    def _compile_text_filter(self, operation: str, operands: List[str], columns: List[dict],
+                             col_idx: int) -> Callable[[tuple], bool]:
+        """Build the predicate comparing the decoded column with the operands as text"""
+        if operation == "=":
+            return TypeConverter.compile_field_predicate(
+                columns, col_idx, "str({field}) == value", {"value": operands[0]})
+        from_val, to_val = operands
+        return TypeConverter.compile_field_predicate(
+            columns, col_idx, "from_val <= str({field}) <= to_val", {"from_val": from_val, "to_val": to_val})
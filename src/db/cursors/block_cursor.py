@@ -1,24 +1,27 @@
 import os
 import io
+import mmap
+
+# archivos de al menos este tamanho se leen a traves de un mapa en memoria
+MMAP_MIN_BYTES = 1 << 20
 
 class BlockCursor:
     def __init__(self, filename, block_size):
         self.filename = filename
         self.block_size = block_size
         self.position = 0  # num de bloque actual (0-based)
+        self._mm = None  # mapa de solo lectura del archivo, ver _mapped
 
         if os.path.exists(filename):
             self.file = open(filename, 'r+b')
         else:
             self.file = open(filename, 'w+b')
+        # tamanho del archivo, actualizado por las escrituras de este cursor
+        self._size = os.fstat(self.file.fileno()).st_size
 
     def read(self):
         """Lee y retorna el bloque en bytes."""
-        self.file.seek(self.position * self.block_size)
-        data = self.file.read(self.block_size)
-        if len(data) < self.block_size:
-            return None
-        return data
+        return self.read_block(self.position)
 
     def advance_block(self):
         """Ir al siguiente bloque."""
@@ -35,7 +38,8 @@ class BlockCursor:
 
         self.file.seek(0, io.SEEK_END)
         self.file.write(data)
-        self.position = self.file.tell() // self.block_size  # Update position
+        self._size = self.file.tell()
+        self.position = self._size // self.block_size  # Update position
 
     def overwrite_current(self, data):
         """Sobreescribir bloque."""
@@ -44,6 +48,7 @@ class BlockCursor:
 
         self.file.seek(self.position * self.block_size)
         self.file.write(data)
+        self._size = max(self._size, (self.position + 1) * self.block_size)
 
     def eof(self):
         """Verificar si el cursor esta al final del archivo."""
@@ -51,11 +56,7 @@ class BlockCursor:
 
     def _file_size(self):
         """obtener tamanho del archivo."""
-        current_pos = self.file.tell()
-        self.file.seek(0, io.SEEK_END)
-        size = self.file.tell()
-        self.file.seek(current_pos)
-        return size
+        return self._size
 
     def current_block_number(self):
         """Return bloque actual."""
@@ -67,7 +68,21 @@ class BlockCursor:
     def goto_end(self):
         self.position = self.total_blocks()
 
+    def _mapped(self):
+        """Mapa de solo lectura si el archivo es grande, se remapea cuando este cursor lo agranda."""
+        if self._size < MMAP_MIN_BYTES:
+            return None
+        if self._mm is None or len(self._mm) < self._size:
+            self.file.flush()
+            if self._mm is not None:
+                self._mm.close()
+            self._mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm
+
     def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
         self.file.close()
 
     def __enter__(self):
@@ -81,10 +96,15 @@ class BlockCursor:
 
     def read_block(self, block_number):
         """Leer bloque sin cambiar posicion del cursor."""
-        current_pos = self.position
-        self.goto_block(block_number)
-        data = self.read()
-        self.goto_block(current_pos)
+        self.file.flush()  # las escrituras en buffer deben ser visibles para la lectura
+        offset = block_number * self.block_size
+        mm = self._mapped()
+        if mm is not None:
+            data = mm[offset:offset + self.block_size]
+        else:
+            data = os.pread(self.file.fileno(), self.block_size, offset)
+        if len(data) < self.block_size:
+            return None
         return data
 
     def update_block(self, block_number, data):
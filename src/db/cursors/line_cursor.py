@@ -1,19 +1,31 @@
 import os
 import io
+import mmap
+import struct
+from typing import Callable, Iterator, List, Optional, Tuple
+import numpy as np
+
+# Bytes read at a time when scanning the whole file
+SCAN_CHUNK_BYTES = 1 << 20
+
+# Files at least this large are read through a memory map
+MMAP_MIN_BYTES = 1 << 20
+
+# Buffer of the file object, sized for record-by-record sequential reads
+FILE_BUFFER_BYTES = io.DEFAULT_BUFFER_SIZE * 8
 
 class LineCursor:
     """A cursor for reading fixed-length records from a binary file"""
     
-    def __init__(self, filename: str, record_size: int):
+    def __init__(self, filename: str, record_size: int, record_struct: Optional[struct.Struct] = None):
         self.filename = filename
         self.record_size = record_size
+        self.record_struct = record_struct  # Compiled record format, needed by read_values_at
+        self._buffer = bytearray(record_size)  # Reused by read_values_at
         self.file = None
+        self._mm = None  # Read-only map of the file, see _mapped
         self.position = 0  # current record number (0-based)
-        
-        if os.path.exists(filename):
-            self.file = open(filename, 'r+b')
-        else:
-            self.file = open(filename, 'w+b')
+        self._size = 0  # File size, kept up to date by this cursor's own writes
         
     def read_record(self) -> bytes:
         """Read and return the current record in bytes."""
@@ -23,11 +35,14 @@ class LineCursor:
         # Calculate the correct position in bytes
         byte_position = self.position * self.record_size
         
-        # Seek to the correct position
-        self.file.seek(byte_position)
-        
-        # Read the record
-        data = self.file.read(self.record_size)
+        mm = self._mapped()
+        if mm is not None:
+            # Slice the page cache directly, no seek or read call
+            self.file.flush()  # Make this cursor's buffered writes visible to the map
+            data = mm[byte_position:byte_position + self.record_size]
+        else:
+            self.file.seek(byte_position)
+            data = self.file.read(self.record_size)
         
         if len(data) < self.record_size:
             return None
@@ -43,12 +58,8 @@ class LineCursor:
         if not self.file:
             raise ValueError("File not open")
             
-        # Update the current position
+        # Only the position moves, every read and write seeks to it itself
         self.position = record_number
-        byte_position = self.position * self.record_size
-        
-        # Seek to the position
-        self.file.seek(byte_position)
 
     def append_record(self, data: bytes):
         """Append record to end of file."""
@@ -57,7 +68,8 @@ class LineCursor:
 
         self.file.seek(0, io.SEEK_END)
         self.file.write(data)
-        self.position = self.file.tell() // self.record_size
+        self._size = self.file.tell()
+        self.position = self._size // self.record_size
 
     def overwrite_current(self, data: bytes):
         """Overwrite current record."""
@@ -66,6 +78,7 @@ class LineCursor:
 
         self.file.seek(self.position * self.record_size)
         self.file.write(data)
+        self._size = max(self._size, (self.position + 1) * self.record_size)
 
     def eof(self) -> bool:
         """Check if cursor is at end of file."""
@@ -73,11 +86,7 @@ class LineCursor:
 
     def _file_size(self) -> int:
         """Get file size in bytes."""
-        current_pos = self.file.tell()
-        self.file.seek(0, io.SEEK_END)
-        size = self.file.tell()
-        self.file.seek(current_pos)
-        return size
+        return self._size
 
     def current_record_number(self) -> int:
         """Return current record number."""
@@ -91,14 +100,41 @@ class LineCursor:
         """Go to last record."""
         self.position = self.total_records()
 
+    def _mapped(self) -> Optional[mmap.mmap]:
+        """Read-only map of the file once it is large enough, remapped after this cursor grows it"""
+        if self._size < MMAP_MIN_BYTES:
+            return None
+        if self._mm is None or len(self._mm) < self._size:
+            self.file.flush()
+            if self._mm is not None:
+                self._mm.close()
+            self._mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mm
+
     def close(self):
         """Close the file."""
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # A caller still holds a view of it, it is unmapped once that is released
+            self._mm = None
         if self.file:
             self.file.close()
             self.file = None
 
+    def _ensure_open(self):
+        """Open the file for reading and writing, creating it if needed, unless it is already open"""
+        if self.file:
+            return
+        # A single open call creates the file, there is no window between checking and opening
+        fd = os.open(self.filename, os.O_RDWR | os.O_CREAT, 0o666)
+        self.file = os.fdopen(fd, 'r+b', buffering=FILE_BUFFER_BYTES)
+        self._size = os.fstat(fd).st_size
+
     def __enter__(self):
-        """Open file for reading and writing"""
+        """Open file for reading and writing, the cursor can be entered again after it is closed"""
+        self._ensure_open()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -109,21 +145,133 @@ class LineCursor:
         """Get total number of records."""
         if not self.file:
             raise ValueError("File not open")
-        current = self.file.tell()
-        self.file.seek(0, 2)  # Seek to end
-        size = self.file.tell()
-        self.file.seek(current)  # Restore position
-        total = size // self.record_size
-        return total
+        return self._file_size() // self.record_size
 
     def read_at(self, record_number: int) -> bytes:
         """Read record at position without changing cursor position."""
-        current_pos = self.position
-        self.goto_record(record_number)
-        data = self.read_record()
-        self.goto_record(current_pos)
+        if not self.file:
+            raise ValueError("File not open")
+
+        self.file.flush()  # Make this cursor's buffered writes visible to the read
+        data = os.pread(self.file.fileno(), self.record_size, record_number * self.record_size)
+        if len(data) < self.record_size:
+            return None
         return data
 
+    def read_values_at(self, record_number: int) -> Optional[tuple]:
+        """Read and unpack the record at a position through a reused buffer, None past the end"""
+        if not self.file:
+            raise ValueError("File not open")
+
+        # A single positional read straight into the buffer, or none at all when the file is
+        # mapped: scattered index lookups would only waste the file object's read-ahead
+        self.file.flush()  # Make this cursor's buffered writes visible to the read
+        offset = record_number * self.record_size
+        mm = self._mapped()
+        if mm is not None:
+            if offset + self.record_size > len(mm):
+                return None
+            return self.record_struct.unpack_from(mm, offset)
+        if os.preadv(self.file.fileno(), [self._buffer], offset) < self.record_size:
+            return None
+        return self.record_struct.unpack_from(self._buffer)
+
+    def read_values_sorted(self, record_numbers: List[int]) -> Iterator[Tuple[int, tuple]]:
+        """
+        Read and unpack the records at ascending, distinct positions, yielding (position, values).
+        Each run of consecutive positions is fetched with one positional read, or sliced from the
+        map of a large file, and the kernel is told about the whole span up front so it can
+        prefetch between runs. Positions past the end are not yielded.
+        """
+        if not self.file:
+            raise ValueError("File not open")
+        if not record_numbers:
+            return
+
+        self.file.flush()  # Make this cursor's buffered writes visible to the reads
+        fd = self.file.fileno()
+        size = self.record_size
+        mm = self._mapped()
+        if mm is None and len(record_numbers) > 1 and hasattr(os, 'posix_fadvise'):
+            span = record_numbers[-1] - record_numbers[0] + 1
+            os.posix_fadvise(fd, record_numbers[0] * size, span * size, os.POSIX_FADV_WILLNEED)
+
+        max_run = max(1, SCAN_CHUNK_BYTES // size)
+        i, n = 0, len(record_numbers)
+        while i < n:
+            start = record_numbers[i]
+            j = i + 1
+            while j < n and j - i < max_run and record_numbers[j] == record_numbers[j - 1] + 1:
+                j += 1
+            if mm is not None:
+                end = min((start + j - i) * size, len(mm))
+                for offset in range(start * size, end - size + 1, size):
+                    yield offset // size, self.record_struct.unpack_from(mm, offset)
+            else:
+                data = os.pread(fd, (j - i) * size, start * size)
+                usable = len(data) - len(data) % size
+                for k, values in enumerate(self.record_struct.iter_unpack(memoryview(data)[:usable])):
+                    yield start + k, values
+            i = j
+
+    def read_records(self, record_numbers: List[int]) -> List[Optional[tuple]]:
+        """
+        Read and unpack the records at any positions, returned in the order they were asked for
+        with None past the end. The file is read in position order, see read_values_sorted.
+        """
+        unpacked = dict(self.read_values_sorted(sorted(set(record_numbers))))
+        return [unpacked.get(n) for n in record_numbers]
+
+    def read_chunks(self) -> Iterator[memoryview]:
+        """Read the file from the start in large chunks, each holding only complete records"""
+        if not self.file:
+            raise ValueError("File not open")
+
+        chunk_size = max(1, SCAN_CHUNK_BYTES // self.record_size) * self.record_size
+        mm = self._mapped()
+        if mm is not None:
+            # Views into the page cache, nothing is copied
+            self.file.flush()  # Make this cursor's buffered writes visible to the map
+            view = memoryview(mm)
+            end = len(mm) - len(mm) % self.record_size
+            for offset in range(0, end, chunk_size):
+                yield view[offset:min(offset + chunk_size, end)]
+            return
+
+        offset = 0
+        while True:
+            self.file.seek(offset)
+            chunk = self.file.read(chunk_size)
+            offset += len(chunk)
+            usable = len(chunk) - len(chunk) % self.record_size  # Ignore a trailing partial record
+            if usable:
+                yield memoryview(chunk)[:usable]
+            if len(chunk) < chunk_size:
+                return
+
+    def scan(self, record_struct: struct.Struct) -> Iterator[tuple]:
+        """Unpack every complete record from the start of the file, reading it in large chunks"""
+        for chunk in self.read_chunks():
+            yield from record_struct.iter_unpack(chunk)
+
+    def scan_live(self, record_struct: struct.Struct,
+                  where: Optional[Callable[[np.ndarray], np.ndarray]] = None) -> Iterator[tuple]:
+        """
+        Unpack every live record from the start of the file. Deleted records are dropped a
+        chunk at a time with a mask over the deletion marker byte, before anything is unpacked.
+        where, if given, takes the chunk as a 2-D array of record bytes and returns a mask
+        of the records to keep as well.
+        """
+        for chunk in self.read_chunks():
+            rows = np.frombuffer(chunk, dtype=np.uint8).reshape(-1, self.record_size)
+            live = rows[:, 0] == 0
+            if where is not None:
+                live &= where(rows)
+            if live.all():
+                yield from record_struct.iter_unpack(chunk)
+            else:
+                yield from record_struct.iter_unpack(rows[live])
+
     def update_record(self, record_number: int, data: bytes):
         """Update record at position."""
         if len(data) != self.record_size:
@@ -1,13 +1,104 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List
 from .query_parser import QueryParser
 from .query_runner import QueryRunner
 from ..storage_management.table_manager import TableManager
 
+# Number of distinct statement templates whose parse result is kept
+PARSE_CACHE_SIZE = 512
+
+# Statements parsed by sqlglot, the only ones worth caching
+_TEMPLATED_STATEMENTS = ("SELECT", "INSERT", "DELETE")
+
+# Literals of a statement: quoted strings and numbers that are not part of a name.
+# Double-quoted identifiers are matched only so the numbers in them are left alone
+_LITERAL_RE = re.compile(r'"[^"]*"|\'(?:[^\']|\'\')*\'|(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])')
+
+# Parameter i of a template is the string literal '\x01i\x01'. The parser keeps
+# literals quoted or strips their quotes, both forms are bound
+_PARAMETER_RE = re.compile("'\x01(\\d+)\x01'|\x01(\\d+)\x01")
+
+# String literals that become parameters: plain text the parser only unquotes. Others
+# (escaped quotes, surrounding spaces, "ARRAY[...]" values) stay in the template
+_PARAMETER_STRING_RE = re.compile(r"'(?! )[\w\-.:,/@+ ]*(?<! )'")
+
+def _is_parameter(literal: str) -> bool:
+    """Whether a literal of a statement can be replaced by a parameter"""
+    return literal[0] != "'" or bool(_PARAMETER_STRING_RE.fullmatch(literal))
+
+def _bind(parsed: Any, literals: List[str]) -> Any:
+    """Copy of a parsed template with each parameter replaced by its literal"""
+    if isinstance(parsed, dict):
+        return {key: _bind(value, literals) for key, value in parsed.items()}
+    if isinstance(parsed, list):
+        return [_bind(value, literals) for value in parsed]
+    if isinstance(parsed, str) and "\x01" in parsed:
+        return _PARAMETER_RE.sub(
+            lambda m: literals[int(m.group(1))] if m.group(1) else literals[int(m.group(2))].strip("'\""),
+            parsed)
+    return parsed
+
+def _has_error(parsed: Dict[str, Any]) -> bool:
+    """Whether the parser rejected a statement or one of its filters"""
+    return "error" in parsed or any("error" in f for f in parsed.get("filters", []))
+
 class QueryHandler:
     def __init__(self, data_dir="data"):
         self.data_dir = data_dir
         self.parser = QueryParser()
         self.table_manager = TableManager(data_dir)
         self.runner = QueryRunner(self.table_manager)
+        # Parse result of each statement template, None for templates that are parsed
+        # again every time. Shared by the threads serving queries
+        self._templates = OrderedDict()
+        self._templates_lock = threading.Lock()
+
+    def parse(self, query: str) -> Dict[str, Any]:
+        """
+        Parse a query into the dict execute_parsed takes. SELECT, INSERT and DELETE statements are parsed once per template,
+        the statement with its literals replaced by parameters, and each call binds its
+        own literals into a fresh copy of the cached result.
+        """
+        query = query.strip()
+        if query[:6].upper() not in _TEMPLATED_STATEMENTS:
+            return self.parser.parse(query)
+
+        literals = []
+
+        def parameter(match: re.Match) -> str:
+            literal = match.group()
+            if literal[0] == '"' or not _is_parameter(literal):
+                return literal
+            literals.append(literal)
+            return f"'\x01{len(literals) - 1}\x01'"
+
+        template = _LITERAL_RE.sub(parameter, query)
+        with self._templates_lock:
+            cached = template in self._templates
+            if cached:
+                self._templates.move_to_end(template)
+                parsed_template = self._templates[template]
+
+        if cached:
+            if parsed_template is None:
+                return self.parser.parse(query)
+            return _bind(parsed_template, literals)
+
+        # First time this template is seen: only cache it if binding these literals
+        # gives what parsing the statement itself does. A template the parser rejects
+        # could be accepted with other literals, or the error points at a column that
+        # depends on their length
+        parsed = self.parser.parse(query)
+        parsed_template = self.parser.parse(template)
+        if _has_error(parsed_template) or _bind(parsed_template, literals) != parsed:
+            parsed_template = None
+        with self._templates_lock:
+            self._templates[template] = parsed_template
+            if len(self._templates) > PARSE_CACHE_SIZE:
+                self._templates.popitem(last=False)
+        return parsed
     
     def execute_query(self, query: str):
         """
@@ -17,8 +108,17 @@ class QueryHandler:
         """
         try:
             # Parsear query a formato estructurado
-            parsed_query = self.parser.parse(query)
-            
+            parsed_query = self.parse(query)
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+        return self.execute_parsed(parsed_query)
+
+    def execute_parsed(self, parsed_query: Dict[str, Any]):
+        """Execute a query returned by parse(), which may modify the dict"""
+        try:
             if "error" in parsed_query:
                 return {
                     "status": "error",
@@ -3,6 +3,17 @@ import sqlglot
 from sqlglot import parse_one, exp
 from typing import Dict, Any, List
 
+# Patterns compiled once at import
+_VALUES_PAREN_RE = re.compile(r'VALUES\s*\((.*)\)')
+_CREATE_TABLE_RE = re.compile(r'CREATE TABLE (\w+)\s*\((.*?)\);?', re.IGNORECASE | re.DOTALL)
+_ARRAY_RE = re.compile(r'ARRAY\[(.*?)\]')
+_VARCHAR_SIZE_RE = re.compile(r'VARCHAR\[(\d+)\]')
+_INDEX_RE = re.compile(r'INDEX\s+(\w+)', re.IGNORECASE)
+_CREATE_FROM_FILE_RE = re.compile(r'create table (\w+) from file ["\']([^"\']+)["\']', re.IGNORECASE)
+_USING_INDEX_RE = re.compile(r'using index (\w+)\(["\']?(\w+)["\']?\)', re.IGNORECASE)
+_POINT_RE = re.compile(r'POINT\(([\d\., ]+)\)')
+_DROP_TABLE_RE = re.compile(r'DROP TABLE (\w+);?', re.IGNORECASE)
+
 class QueryParser:
     def __init__(self):
         self.supported_types = {
@@ -30,7 +41,7 @@ class QueryParser:
             # Limpiar la query eliminando nuevas lineas y espacios extra
             query = ' '.join(line.strip() for line in query.split('\n'))
             # Eliminar cualquier parentesis alrededor de la clausula VALUES
-            query = re.sub(r'VALUES\s*\((.*)\)', r'VALUES \1', query)
+            query = _VALUES_PAREN_RE.sub(r'VALUES \1', query)
         
         try:
             ast = parse_one(query)
@@ -50,7 +61,7 @@ class QueryParser:
         # Eliminar nuevas lineas y espacios extra
         query = ' '.join(query.split())
         
-        match = re.search(r'CREATE TABLE (\w+)\s*\((.*?)\);?', query, re.IGNORECASE | re.DOTALL)
+        match = _CREATE_TABLE_RE.search(query)
         if not match:
             return {"error": "Malformed CREATE TABLE"}
 
@@ -61,6 +72,7 @@ class QueryParser:
         columns = []
         indexes = {}
         primary_key = None
+        pk_monotonic = False
 
         for col_def in column_defs:
             parts = col_def.split()
@@ -71,15 +83,15 @@ class QueryParser:
             col_type = parts[1]
             
             # Parse array type
-            array_match = re.search(r'ARRAY\[(.*?)\]', col_type)
+            array_match = _ARRAY_RE.search(col_type)
             if array_match:
                 base_type = array_match.group(1)
                 if base_type not in self.supported_types:
                     return {"error": f"Unsupported array type: {base_type}"}
                 col_type = f"ARRAY[{base_type}]"
-            elif not (col_type in self.supported_types or re.match(r'VARCHAR\[\d+\]', col_type)):
+            elif not (col_type in self.supported_types or _VARCHAR_SIZE_RE.match(col_type)):
                 # Check if it's VARCHAR with size
-                varchar_match = re.search(r'VARCHAR\[(\d+)\]', col_type)
+                varchar_match = _VARCHAR_SIZE_RE.search(col_type)
                 if not varchar_match:
                     return {"error": f"Unsupported type: {col_type}"}
             
@@ -88,9 +100,17 @@ class QueryParser:
                 primary_key = col_name
                 # Primary key automatically gets a B+ tree index
                 indexes[col_name] = 'bplus'
+
+                # MONOTONIC promises ever increasing keys, so inserts can skip the duplicate search
+                if 'MONOTONIC' in parts:
+                    if col_type not in ("INT", "FLOAT", "DATE"):
+                        return {"error": f"MONOTONIC primary key must be INT, FLOAT or DATE, got {col_type}"}
+                    pk_monotonic = True
+            elif 'MONOTONIC' in parts:
+                return {"error": f"MONOTONIC is only allowed on the primary key, not on {col_name}"}
             
             # Check for INDEX
-            index_match = re.search(r'INDEX\s+(\w+)', col_def, re.IGNORECASE)
+            index_match = _INDEX_RE.search(col_def)
             if index_match:
                 index_type = index_match.group(1).lower()
                 if index_type.upper() in self.supported_indexes:
@@ -103,14 +123,14 @@ class QueryParser:
             "table_name": table_name,
             "columns": columns,
             "indexes": indexes,
-            "primary_key": primary_key
+            "primary_key": primary_key,
+            "pk_monotonic": pk_monotonic
         }
     
     def _parse_create_from_file(self, query: str) -> Dict[str, Any]:
         """Parse CREATE TABLE from file with index specifications"""
-        # Basic pattern for table name and file path
-        base_pattern = r'create table (\w+) from file ["\']([^"\']+)["\']'
-        base_match = re.search(base_pattern, query, re.IGNORECASE)
+        # Table name and file path
+        base_match = _CREATE_FROM_FILE_RE.search(query)
         
         if not base_match:
             return {"error": "Invalid CREATE TABLE FROM FILE syntax"}
@@ -122,8 +142,7 @@ class QueryParser:
         index_info = {}
         
         # Check for index specifications
-        index_pattern = r'using index (\w+)\(["\']?(\w+)["\']?\)'
-        index_matches = re.finditer(index_pattern, query, re.IGNORECASE)
+        index_matches = _USING_INDEX_RE.finditer(query)
         
         for match in index_matches:
             index_type, index_column = match.groups()
@@ -208,7 +227,7 @@ class QueryParser:
             if len(expressions) == 2:
                 point_exp = expressions[0].sql()
                 radius_exp = expressions[1].sql()
-                point_match = re.search(r'POINT\(([\d\., ]+)\)', point_exp)
+                point_match = _POINT_RE.search(point_exp)
                 if point_match:
                     coords = [float(c.strip()) for c in point_match.group(1).split(',')]
                     radius = float(radius_exp)
@@ -272,7 +291,7 @@ class QueryParser:
 
     def _parse_drop_table(self, query: str) -> Dict[str, Any]:
         """Parse DROP TABLE query"""
-        match = re.search(r'DROP TABLE (\w+);?', query, re.IGNORECASE)
+        match = _DROP_TABLE_RE.search(query)
         if not match:
             return {"error": "Invalid DROP TABLE syntax"}
             
@@ -1,20 +1,39 @@
 import struct
 import os
 import bisect
+import mmap
+import logging
 from ...cursors.line_cursor import LineCursor
 from ...cursors import BlockCursor
+from ...utils.type_converter import encode_int_key, encode_float_key, encode_bytes_key
+
+logger = logging.getLogger(__name__)
 
 # Constants for B+ tree
 PAGE_SIZE = 4096  # 4KB pages
 KEY_SIZE = 8  # 8 bytes for key (uint64)
 PTR_SIZE = 8  # 8 bytes for pointer (signed long long)
 PAGE_HEADER_SIZE = 15  # is_leaf(1) + num_keys(2) + page_id(4) + parent_id(8)
-HEADER_SIZE = 8  # root_block(8)
+HEADER_SIZE = 16  # root_block(8) + key_format(8)
 
 # Format strings
 PTR_FORMAT = "=q"  # 8 bytes for pointers (signed long long)
 PAGE_HEADER_FORMAT = "=BHiq"  # is_leaf(1) + num_keys(2) + page_id(4) + parent_id(8)
-HEADER_FORMAT = "=q"  # root_block(8)
+HEADER_FORMAT = "=qq"  # root_block(8) + key_format(8)
+
+# Encoding of the keys in the file, see TypeConverter. Files written before it was
+# stored hold 0 there and are rebuilt from their data file when opened. Version 2
+# keys VARCHARs without the row number prefix of older CSV loads, version 3 gives
+# -0.0 the key of 0.0
+KEY_FORMAT_VERSION = 3
+
+# Compiled once, page (de)serialization runs on every index access
+_PTR = struct.Struct(PTR_FORMAT)
+_PAGE_HEADER = struct.Struct(PAGE_HEADER_FORMAT)
+_HEADER = struct.Struct(HEADER_FORMAT)
+
+# Leaf entries of deleted records keep their key and store the pointer as ~ptr (negative)
+DELETED_MARKER = b'\x01'
 
 class BPlusPage:
     """Base class for B+ tree pages"""
@@ -26,7 +45,7 @@ class BPlusPage:
 
     def header_bytes(self):
         """Pack page header into bytes"""
-        return struct.pack(PAGE_HEADER_FORMAT,
+        return _PAGE_HEADER.pack(
             1 if self.is_leaf else 0,
             self.num_keys,
             self.page_id,
@@ -46,18 +65,17 @@ class InternalPage(BPlusPage):
         # Pack keys and pointers - keys are already raw bytes
         for key, ptr in zip(self.keys, self.pointers):
             data += key  # Key is already raw bytes
-            data += struct.pack(PTR_FORMAT, ptr)
+            data += _PTR.pack(ptr)
             
         # Pack last pointer
-        data += struct.pack(PTR_FORMAT, self.pointers[-1])
+        data += _PTR.pack(self.pointers[-1])
         
         return data.ljust(PAGE_SIZE, b'\x00')
 
     @classmethod
     def unpack(cls, data, cursor=None):
         """Unpack page data"""
-        header = data[:PAGE_HEADER_SIZE]
-        is_leaf, num_keys, page_id, parent_id = struct.unpack(PAGE_HEADER_FORMAT, header)
+        is_leaf, num_keys, page_id, parent_id = _PAGE_HEADER.unpack_from(data)
 
         if is_leaf:
             raise ValueError("Not an internal page")
@@ -72,13 +90,13 @@ class InternalPage(BPlusPage):
             key = data[offset:offset + KEY_SIZE]
             offset += KEY_SIZE
             # Read pointer
-            ptr = struct.unpack(PTR_FORMAT, data[offset:offset + PTR_SIZE])[0]
+            ptr = _PTR.unpack_from(data, offset)[0]
             keys.append(key)
             pointers.append(ptr)
             offset += PTR_SIZE
             
         # Read last pointer
-        last_ptr = struct.unpack(PTR_FORMAT, data[offset:offset + PTR_SIZE])[0]
+        last_ptr = _PTR.unpack_from(data, offset)[0]
         pointers.append(last_ptr)
 
         return cls(page_id, parent_id, keys, pointers)
@@ -96,18 +114,17 @@ class LeafPage(BPlusPage):
         # Pack key-value pairs - keys are already raw bytes
         for key, ptr in self.key_value_pairs:
             data += key  # Key is already raw bytes
-            data += struct.pack(PTR_FORMAT, ptr)
+            data += _PTR.pack(ptr)
             
         # Pack next leaf pointer
-        data += struct.pack(PTR_FORMAT, self.next_leaf)
+        data += _PTR.pack(self.next_leaf)
         
         return data.ljust(PAGE_SIZE, b'\x00')
 
     @classmethod
     def unpack(cls, data, cursor=None):
         """Unpack page data"""
-        header = data[:PAGE_HEADER_SIZE]
-        is_leaf, num_keys, page_id, parent_id = struct.unpack(PAGE_HEADER_FORMAT, header)
+        is_leaf, num_keys, page_id, parent_id = _PAGE_HEADER.unpack_from(data)
 
         if not is_leaf:
             raise ValueError("Not a leaf page")
@@ -121,12 +138,12 @@ class LeafPage(BPlusPage):
             key = data[offset:offset + KEY_SIZE]
             offset += KEY_SIZE
             # Read pointer
-            ptr = struct.unpack(PTR_FORMAT, data[offset:offset + PTR_SIZE])[0]
+            ptr = _PTR.unpack_from(data, offset)[0]
             key_value_pairs.append((key, ptr))
             offset += PTR_SIZE
 
-        # Read next leaf pointer
-        next_leaf = struct.unpack(PTR_FORMAT, data[-PTR_SIZE:])[0]
+        # Read next leaf pointer, pack() writes it right after the entries
+        next_leaf = _PTR.unpack_from(data, offset)[0]
 
         return cls(page_id, parent_id, key_value_pairs, next_leaf)
 
@@ -137,7 +154,8 @@ class BPlusTreeIndex:
         self.data_format = data_format
         self.key_position = key_position
         self.root_block = 0
-        self.record_size = struct.calcsize(data_format)
+        self._record_struct = struct.Struct(data_format)  # Compiled once, used per record
+        self.record_size = self._record_struct.size
 
         # Calculate capacities based on fixed sizes
         self.internal_capacity = (PAGE_SIZE - PAGE_HEADER_SIZE - PTR_SIZE) // (KEY_SIZE + PTR_SIZE)
@@ -145,34 +163,35 @@ class BPlusTreeIndex:
 
         self._init_storage()
 
-        # Don't build from data immediately since the data file might be empty
-        # The index will be built when data is inserted
-
     def _init_storage(self):
         file_exists = os.path.exists(self.index_filename)
         if not file_exists:
-            self.create_empty()
+            # The data file may already hold records, e.g. loaded from a CSV file
+            self.build_from_data()
             return
 
         # File exists, check if it's properly initialized
         with BlockCursor(self.index_filename, PAGE_SIZE) as cursor:
             header_data = cursor.read_block(0)
         if header_data is None or len(header_data) == 0:
-            # File exists but is empty, create new tree
-            self.create_empty()
+            # File exists but is empty, create new tree over the records there are
+            self.build_from_data()
             return
 
         # Ensure header is properly formatted
         try:
-            self.root_block = struct.unpack(HEADER_FORMAT, header_data[:HEADER_SIZE])[0]
+            self.root_block, key_format = struct.unpack(HEADER_FORMAT, header_data[:HEADER_SIZE])
         except struct.error:
             raise ValueError("Invalid header block format")
+        if key_format != KEY_FORMAT_VERSION:
+            logger.info("Rebuilding %s, its keys use an older encoding", self.index_filename)
+            self.build_from_data()
 
     def create_empty(self):
         """Create an empty B+ tree index structure"""
         with BlockCursor(self.index_filename, PAGE_SIZE) as cursor:
             root_block = 1
-            header_data = struct.pack(HEADER_FORMAT, root_block).ljust(HEADER_SIZE, b'\x00')
+            header_data = struct.pack(HEADER_FORMAT, root_block, KEY_FORMAT_VERSION)
             cursor.append_block(header_data.ljust(PAGE_SIZE, b'\x00'))
             root_page = LeafPage(
                 page_id=root_block,
@@ -183,6 +202,13 @@ class BPlusTreeIndex:
             cursor.append_block(root_page.pack())
         self.root_block = root_block
 
+    def _load_root(self, cursor):
+        """
+        Read the root block from the header. Another process may have split the root
+        since this instance last looked, so every operation starts from the file.
+        """
+        self.root_block = _HEADER.unpack_from(cursor.read_block(0))[0]
+
     def _parse_page(self, data):
         if not data:
             return None
@@ -193,69 +219,162 @@ class BPlusTreeIndex:
             return InternalPage.unpack(data)
 
     def build_from_data(self):
-        """Build index from existing data file"""
-        # Reset index on disk
-        if os.path.exists(self.index_filename):
-            os.remove(self.index_filename)
-        self._init_storage()
-        
-        # Read data file and add each record
+        """
+        Build index from existing data file. The tree is written to a new file that
+        then replaces the index, so readers never see a half built one.
+        """
+        index_filename = self.index_filename
+        self.index_filename = index_filename + ".build"
+        try:
+            if os.path.exists(self.index_filename):
+                os.remove(self.index_filename)
+            self.create_empty()
+            self._index_records()
+            os.replace(self.index_filename, index_filename)
+        except Exception:
+            if os.path.exists(self.index_filename):
+                os.remove(self.index_filename)
+            raise
+        finally:
+            self.index_filename = index_filename
+
+    def _index_records(self):
+        """Insert every record of the data file, entries of deleted records are flagged"""
+        if not self.data_filename or not os.path.exists(self.data_filename):
+            return
+
+        # Map the data file and index each record by its line number
+        # (add() would append the record to the data file again)
         try:
             with open(self.data_filename, 'rb') as f:
-                while True:
-                    raw = f.read(self.record_size)
-                    if not raw or len(raw) < self.record_size:
-                        break
-                    self.add(raw)
+                size = os.fstat(f.fileno()).st_size
+                usable = size - size % self.record_size  # Ignore a trailing partial record
+                if not usable:
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mm, 'madvise'):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    with memoryview(mm) as view:
+                        records = self._record_struct.iter_unpack(view[:usable])
+                        for position, values in enumerate(records):
+                            if values[0] == DELETED_MARKER:
+                                position = ~position
+                            self._insert_entry(self._key_from_values(values), position)
         except Exception as e:
             raise ValueError(f"Failed to build index: {str(e)}")
 
     def search(self, key):
         with BlockCursor(self.index_filename, PAGE_SIZE) as cursor:
-            current_block = self.root_block
-            while True:
-                data = cursor.read_block(current_block)
-                if not data:
-                    return None
-
-                page = self._parse_page(data)
-                if page is None:
-                    return None
-
-                if page.is_leaf:
-                    assert isinstance(page, LeafPage)
-                    # Búsqueda lineal en las hojas
-                    for k, v in page.key_value_pairs:
-                        if k == key:
-                            return v
-                    return None
-                else:
-                    assert isinstance(page, InternalPage)
-                    idx = bisect.bisect_right(page.keys, key)
-                    current_block = page.pointers[idx]
+            self._load_root(cursor)
+            # Búsqueda lineal en las hojas
+            for leaf in self._leaves_with_key(cursor, key):
+                for k, v in leaf.key_value_pairs:
+                    if k == key and v >= 0:
+                        return v
+        return None
+
+    def search_all(self, key):
+        """Pointers of every entry of key that is not flagged deleted, in index order"""
+        ptrs = []
+        with BlockCursor(self.index_filename, PAGE_SIZE) as cursor:
+            self._load_root(cursor)
+            for leaf in self._leaves_with_key(cursor, key):
+                ptrs.extend(v for k, v in leaf.key_value_pairs if k == key and v >= 0)
+        return ptrs
+
+    def search_live(self, key):
+        """
+        Like search(), also checking the deletion marker of the record in the data file.
+        Indexes written before DELETE flagged entries can point at deleted records: such
+        an entry is flagged on the way and the search goes on with the next one.
+        """
+        ptr = self.search(key)
+        while ptr is not None and self._record_deleted(ptr):
+            self.mark_deleted(key, ptr)
+            ptr = self.search(key)
+        return ptr
+
+    def _record_deleted(self, ptr):
+        """Whether the record at ptr is marked deleted in the data file, or missing"""
+        with open(self.data_filename, 'rb') as f:
+            return os.pread(f.fileno(), len(DELETED_MARKER), ptr * self.record_size) != b'\x00'
+
+    def is_deleted(self, key):
+        """Whether key has entries and all of them belong to deleted records"""
+        deleted = False
+        with BlockCursor(self.index_filename, PAGE_SIZE) as cursor:
+            self._load_root(cursor)
+            for leaf in self._leaves_with_key(cursor, key):
+                for k, v in leaf.key_value_pairs:
+                    if k == key:
+                        if v >= 0:
+                            return False
+                        deleted = True
+        return deleted
+
+    def search_many(self, keys):
+        """
+        Search several keys sorted in ascending order, reading each leaf once.
+        Returns a dict mapping every key found to its pointer.
+        """
+        found = {}
+        i, n = 0, len(keys)
+        with BlockCursor(self.index_filename, PAGE_SIZE) as cursor:
+            self._load_root(cursor)
+            while i < n:
+                leaf, upper = self._find_leaf_bounded(cursor, keys[i], [])
+                in_leaf = {}
+                for k, v in leaf.key_value_pairs:
+                    if v >= 0:
+                        in_leaf.setdefault(k, v)  # First live match wins, like search()
+                # Every key below the next separator lives in this same leaf
+                while i < n and (upper is None or keys[i] < upper):
+                    if keys[i] in in_leaf:
+                        found[keys[i]] = in_leaf[keys[i]]
+                    i += 1
+        return found
 
     def range_search(self, begin, end):
+        """Pointers of the entries with begin <= key <= end that are not flagged deleted, in key order"""
         ptrs = []
         with BlockCursor(self.index_filename, PAGE_SIZE) as cursor:
-            # 1) Encontrar la hoja donde podría aparecer 'begin'
-            leaf = self._find_leaf_page(cursor, begin, [])
-            visited = set()
-            # 2) Recorrer hojas sucesivas
-            while leaf and leaf.page_id not in visited:
-                visited.add(leaf.page_id)
+            self._load_root(cursor)
+            for leaf in self._leaves_from(cursor, begin):
                 for k, ptr in leaf.key_value_pairs:
                     if k < begin:
                         continue
                     if k > end:
                         return ptrs
-                    ptrs.append(ptr)
-                # Avanzar a la siguiente hoja
-                next_id = leaf.next_leaf
-                if next_id is None or next_id < 0:
-                    break
-                data = cursor.read_block(next_id)
-                leaf = self._parse_page(data)
-            return ptrs
+                    if ptr >= 0:
+                        ptrs.append(ptr)
+        return ptrs
+
+    def _leaves_with_key(self, cursor, key):
+        """
+        Yield the leaves that can hold entries of key, in key order. Entries with
+        the same key (duplicates, deleted records) can spill over into the next leaves.
+        """
+        for page in self._leaves_from(cursor, key):
+            yield page
+            if page.key_value_pairs and page.key_value_pairs[-1][0] > key:
+                return
+
+    def _leaves_from(self, cursor, key):
+        """Yield the leaves from the leftmost one that can hold key to the last one, in key order"""
+        page = self._parse_page(cursor.read_block(self.root_block))
+        while page is not None and not page.is_leaf:
+            # Leftmost child that can hold key, equal keys may sit left of a separator
+            idx = bisect.bisect_left(page.keys, key)
+            page = self._parse_page(cursor.read_block(page.pointers[idx]))
+
+        visited = set()
+        while page is not None and page.page_id not in visited:
+            visited.add(page.page_id)
+            yield page
+            # Block 0 is the header, leaves written before next_leaf was read back hold 0
+            if page.next_leaf <= 0:
+                return
+            page = self._parse_page(cursor.read_block(page.next_leaf))
 
     def _find_child_page(self, page, key):
         """Determine which child page to follow using binary search"""
@@ -278,6 +397,62 @@ class BPlusTreeIndex:
             stack.append(current_block)
             current_block = self._find_child_page(page, key)
 
+    def _find_leaf_bounded(self, cursor, key, stack):
+        """Like _find_leaf_page, also returning the separator above which keys leave this leaf (None if unbounded)"""
+        upper = None
+        current_block = self.root_block
+        while True:
+            page = self._parse_page(cursor.read_block(current_block))
+            if page.is_leaf:
+                return page, upper
+            stack.append(current_block)
+            idx = bisect.bisect_right(page.keys, key)
+            if idx < len(page.keys):
+                upper = page.keys[idx]
+            current_block = page.pointers[idx]
+
+    def _reparent_children(self, page, cursor):
+        """Point the children of an internal page back at it"""
+        for ptr in page.pointers:
+            child = self._parse_page(cursor.read_block(ptr))
+            child.parent_id = page.page_id
+            cursor.update_block(ptr, child.pack())
+
+    def _descend_for_insert(self, cursor, key, stack):
+        """
+        Traverse from root to the leaf for key, splitting every full internal
+        page on the way down (top-down, CLRS style). The parent of the leaf then
+        always has room, so a leaf split never cascades up the tree.
+        Returns the leaf and the separator above which keys leave it (None if unbounded).
+        """
+        page = self._parse_page(cursor.read_block(self.root_block))
+        if not page.is_leaf and page.num_keys >= self.internal_capacity:
+            promoted_key, new_internal = self._split_internal_node(page, cursor)
+            self._reparent_children(new_internal, cursor)
+            self._create_new_root(promoted_key, page.page_id, new_internal.page_id, cursor)
+            page = self._parse_page(cursor.read_block(self.root_block))
+
+        upper = None
+        while not page.is_leaf:
+            idx = bisect.bisect_right(page.keys, key)
+            child = self._parse_page(cursor.read_block(page.pointers[idx]))
+            if not child.is_leaf and child.num_keys >= self.internal_capacity:
+                # The parent was split already if it was full, so it takes the promoted key
+                promoted_key, new_internal = self._split_internal_node(child, cursor)
+                self._reparent_children(new_internal, cursor)
+                page.keys.insert(idx, promoted_key)
+                page.pointers.insert(idx + 1, new_internal.page_id)
+                page.num_keys += 1
+                cursor.update_block(page.page_id, page.pack())
+                if key >= promoted_key:
+                    idx += 1
+                    child = new_internal
+            if idx < len(page.keys):
+                upper = page.keys[idx]
+            stack.append(page.page_id)
+            page = child
+        return page, upper
+
     def _update_leaf(self, page, entries, cursor):
         """actualizar hoja sin split"""
         page.key_value_pairs = entries
@@ -357,7 +532,7 @@ class BPlusTreeIndex:
 
     def _update_root_block(self, new_root_block):
         with BlockCursor(self.index_filename, PAGE_SIZE) as cursor:
-            header_data = struct.pack(HEADER_FORMAT, new_root_block).ljust(PAGE_SIZE, b'\x00')
+            header_data = struct.pack(HEADER_FORMAT, new_root_block, KEY_FORMAT_VERSION).ljust(PAGE_SIZE, b'\x00')
             cursor.update_block(0, header_data)
 
     def _create_new_root(self, K, left_ptr, right_ptr, cursor):
@@ -424,7 +599,8 @@ class BPlusTreeIndex:
         """Insert a new entry into the tree"""
         stack = []
         with BlockCursor(self.index_filename, PAGE_SIZE) as cursor:
-            page = self._find_leaf_page(cursor, key, stack)
+            self._load_root(cursor)
+            page, _ = self._descend_for_insert(cursor, key, stack)
 
             # insertar en la hoja
             temp_entries = self._insert_into_temp_entries(page.key_value_pairs, key, ptr)
@@ -433,35 +609,76 @@ class BPlusTreeIndex:
                 self._update_leaf(page, temp_entries, cursor)
                 return
 
-            # split en la hoja y propagar hacia arriba
+            # split en la hoja, el padre tiene espacio gracias al split preventivo
             promoted_key, new_leaf = self._split_leaf_node(page, temp_entries, cursor)
             self._propagate_split(stack, promoted_key, page.page_id, new_leaf.page_id, cursor)
 
+    def add_sorted(self, entries):
+        """
+        Insert (key, ptr) pairs sorted by key. Consecutive keys that fall in the
+        same leaf are merged into it and the leaf is written once.
+        """
+        i, n = 0, len(entries)
+        with BlockCursor(self.index_filename, PAGE_SIZE) as cursor:
+            self._load_root(cursor)
+            while i < n:
+                stack = []
+                page, upper = self._descend_for_insert(cursor, entries[i][0], stack)
+                temp_entries = self._insert_into_temp_entries(page.key_value_pairs, *entries[i])
+                i += 1
+                while (i < n and len(temp_entries) < self.leaf_capacity
+                       and (upper is None or entries[i][0] < upper)):
+                    temp_entries = self._insert_into_temp_entries(temp_entries, *entries[i])
+                    i += 1
+
+                if len(temp_entries) <= self.leaf_capacity:
+                    self._update_leaf(page, temp_entries, cursor)
+                    continue
+
+                # Only the first entry can overflow the leaf, split as _insert_entry does
+                promoted_key, new_leaf = self._split_leaf_node(page, temp_entries, cursor)
+                self._propagate_split(stack, promoted_key, page.page_id, new_leaf.page_id, cursor)
+
     def _extract_key(self, data):
         """Extract key from raw data - just get the raw bytes for the key"""
         try:
-            unpacked = struct.unpack(self.data_format, data)
-            key_bytes = unpacked[self.key_position]
-            if isinstance(key_bytes, int):
-                # Convert integer to bytes
-                key_bytes = key_bytes.to_bytes(KEY_SIZE, byteorder='little')
-            elif isinstance(key_bytes, str):
-                # Convert string to bytes
-                key_bytes = key_bytes.encode().ljust(KEY_SIZE, b'\x00')
-            elif isinstance(key_bytes, bytes):
-                # Already bytes, just ensure right size
-                key_bytes = key_bytes[:KEY_SIZE].ljust(KEY_SIZE, b'\x00')
-            else:
-                raise ValueError(f"Unsupported key type: {type(key_bytes)}")
-            return key_bytes
+            return self._key_from_values(self._record_struct.unpack(data))
         except Exception as e:
-            print(f"Error extracting key: {e}")
+            logger.error("Error extracting key: %s", e)
             raise
 
+    def _key_from_values(self, unpacked):
+        """Encode the key field of an unpacked record as KEY_SIZE bytes"""
+        key_bytes = unpacked[self.key_position]
+        # Same encodings the SELECT/DELETE/INSERT search keys use, ordered like the values
+        if isinstance(key_bytes, int):
+            key_bytes = encode_int_key(key_bytes)
+        elif isinstance(key_bytes, float):
+            key_bytes = encode_float_key(key_bytes)
+        elif isinstance(key_bytes, str):
+            key_bytes = encode_bytes_key(key_bytes.encode())
+        elif isinstance(key_bytes, bytes):
+            key_bytes = encode_bytes_key(key_bytes)
+        else:
+            raise ValueError(f"Unsupported key type: {type(key_bytes)}")
+        return key_bytes
+
     def insert_key_and_position(self, key, position):
         """Insert a key and position into the index without writing to data file"""
         self._insert_entry(key, position)
 
+    def mark_deleted(self, key, ptr):
+        """Flag the entry of a deleted record so searches skip it without reading the data file"""
+        with BlockCursor(self.index_filename, PAGE_SIZE) as cursor:
+            self._load_root(cursor)
+            for leaf in self._leaves_with_key(cursor, key):
+                for i, (k, v) in enumerate(leaf.key_value_pairs):
+                    if k == key and v == ptr:
+                        leaf.key_value_pairs[i] = (k, ~ptr)
+                        cursor.update_block(leaf.page_id, leaf.pack())
+                        return True
+        return False
+
     def _write_data_record(self, data):
         """Write data record to file and return its line number"""
         with LineCursor(self.data_filename, self.record_size) as lc:
@@ -471,7 +688,7 @@ class BPlusTreeIndex:
             return position
 
     def add(self, data):
-        """Insert a new record into the index and data"""
+        """Insert a new record into the index and data, returning its line number"""
         if len(data) != self.record_size:
             raise ValueError(f"Data size must be {self.record_size} bytes, got {len(data)} bytes")
 
@@ -479,13 +696,15 @@ class BPlusTreeIndex:
             key = self._extract_key(data)
             ptr = self._write_data_record(data)  # ptr is the line number
             self._insert_entry(key, ptr)
+            return ptr
         except Exception as e:
-            print(f"[Error in add method: {e}")
+            logger.error("Error in add method: %s", e)
             raise
 
     def remove(self, key):
         """Elimina clave y reequilibra según algoritmo del paper."""
         with BlockCursor(self.index_filename, PAGE_SIZE) as c:
+            self._load_root(c)
             # Descender hasta la hoja y guardar stack de (blk, page, idx)
             stack=[]
             blk=self.root_block
@@ -526,6 +745,7 @@ class BPlusTreeIndex:
                     child.parent_id = -1
                     c.update_block(child_blk, child.pack())
                     self._update_root_block(child_blk)
+                    self.root_block = child_blk
             return
         
         # Check underflow
@@ -672,6 +892,7 @@ class BPlusTreeIndex:
 
     def print_tree_structure(self):
         with BlockCursor(self.index_filename, PAGE_SIZE) as cursor:
+            self._load_root(cursor)
             print("\n=== ESTRUCTURA DEL ÁRBOL ===")
             queue = [(self.root_block, 0)]
             while queue:
@@ -10,7 +10,8 @@ class SequentialFileIndex:
         self.data_filename = data_filename
         self.data_format = data_format
         self.key_position = key_position
-        self.record_size = struct.calcsize(data_format)
+        self._struct = struct.Struct(data_format)
+        self.record_size = self._struct.size
         
         # Auxiliary file for unsorted records
         self.aux_filename = f"{index_filename}.aux"
@@ -27,7 +28,7 @@ class SequentialFileIndex:
     def _extract_key(self, data: bytes) -> int:
         """Extract key from record data as uint64"""
         try:
-            unpacked = struct.unpack(self.data_format, data)
+            unpacked = self._struct.unpack(data)
             return unpacked[self.key_position]
         except struct.error:
             raise ValueError("Invalid record data format")
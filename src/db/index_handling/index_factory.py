@@ -1,3 +1,4 @@
+import threading
 from .implementations import (
     SequentialFileIndex,
     ISAMSparseIndex,
@@ -16,6 +17,13 @@ class IndexFactory:
         "rtree": RTreeIndex
     }
 
+    # Instances by index file, reused so each file has a single instance. A B+ tree
+    # reads its root from the file on every operation, so the instance stays valid
+    # while other processes write the same file
+    _instances = {}
+    # Guards _instances: handlers on several threads open indexes at once
+    _lock = threading.Lock()
+
     @classmethod
     def get_index(cls, index_type, index_filename, data_filename=None, data_format=None, key_position=0, **kwargs):
         """
@@ -34,11 +42,35 @@ class IndexFactory:
         if not index_class:
             raise ValueError(f"Invalid index type: {index_type}")
 
-        # Create instance
-        return index_class(
-            index_filename=index_filename,
-            data_filename=data_filename,
-            data_format=data_format,
-            key_position=key_position,
-            **kwargs
-        )
+        # Reuse the instance of this file if it was created with the same settings
+        config = (index_class, data_filename, data_format, key_position)
+        if kwargs:
+            return index_class(
+                index_filename=index_filename,
+                data_filename=data_filename,
+                data_format=data_format,
+                key_position=key_position,
+                **kwargs
+            )
+
+        with cls._lock:
+            cached = cls._instances.get(index_filename)
+            if cached is not None and cached[0] == config:
+                return cached[1]
+
+            # Create instance
+            index = index_class(
+                index_filename=index_filename,
+                data_filename=data_filename,
+                data_format=data_format,
+                key_position=key_position
+            )
+            cls._instances[index_filename] = (config, index)
+            return index
+
+    @classmethod
+    def forget(cls, *index_filenames):
+        """Drop the cached instances of index files that were replaced or removed on disk"""
+        with cls._lock:
+            for index_filename in index_filenames:
+                cls._instances.pop(index_filename, None)
@@ -1,5 +1,4 @@
 from typing import Dict, Any
-import struct
 import os
 import time
 from ..cursors.line_cursor import LineCursor
@@ -23,7 +22,8 @@ class TableCompactor:
         try:
             # Create temporary data file
             temp_data_file = f"{table_info['data_file']}.temp"
-            record_size = struct.calcsize(table_info["format_str"])
+            record_struct = self.table_manager.record_struct(table_info)
+            record_size = record_struct.size
             
             # Open source cursor
             src_cursor = LineCursor(table_info["data_file"], record_size)
@@ -32,59 +32,46 @@ class TableCompactor:
             new_positions = {}  # old_pos -> new_pos mapping
             new_record_count = 0
             
-            # Create temporary index files
+            # Temporary index files, by column
             temp_indexes = {}
-            for col, index_type in table_info["indexes"].items():
-                idx_file = table_info["index_files"][col]
-                temp_idx_file = f"{idx_file}.temp"
-                temp_indexes[col] = temp_idx_file
             
             # Copy non-deleted records to temp file
             with open(temp_data_file, 'wb') as dest_file:
                 with src_cursor as cursor:
-                    total_records = cursor.total_records()
-                    for i in range(total_records):
-                        cursor.goto_record(i)
-                        record = cursor.read_record()
-                        if not record:
-                            continue
-                            
-                        # Check if record is not deleted
-                        if record[0] == b'\x00'[0]:  # Not deleted
-                            new_pos = dest_file.tell()
-                            new_positions[i] = new_pos
-                            dest_file.write(record)
-                            new_record_count += 1
+                    i = 0
+                    for chunk in cursor.read_chunks():
+                        for start in range(0, len(chunk), record_size):
+                            # Check if record is not deleted
+                            if chunk[start] == 0:
+                                new_positions[i] = new_record_count * record_size
+                                dest_file.write(chunk[start:start + record_size])
+                                new_record_count += 1
+                            i += 1
 
-            # Rebuild indexes
-            for col, index_type in table_info["indexes"].items():
-                # Get column position (offset by 1 for deletion marker)
-                col_idx = next(
-                    (i for i, c in enumerate(table_info["columns"]) if c["name"] == col),
-                    -1
-                )
-                
-                if col_idx == -1:
-                    continue
+            # Rebuild indexes over the compacted file
+            positions = self.table_manager.column_positions(table_info)
+            try:
+                for col in table_info["indexes"]:
+                    # Get column position (offset by 1 for deletion marker)
+                    col_idx = positions.get(col, -1)
                     
-                # Create new index instance
-                new_index = IndexFactory.get_index(
-                    index_type=index_type.lower(),
-                    index_filename=temp_indexes[col],
-                    data_filename=temp_data_file,
-                    data_format=table_info["format_str"],
-                    key_position=col_idx + 1  # +1 to account for deletion marker
-                )
-                
-                # Rebuild index
-                with LineCursor(temp_data_file, record_size) as cursor:
-                    while not cursor.eof():
-                        record = cursor.read_record()
-                        values = struct.unpack(table_info["format_str"], record)
-                        print(values)
-                        key = values[col_idx + 1]  # +1 to skip deletion marker
-                        new_index.add(key)
-                        cursor.advance_record()
+                    if col_idx == -1:
+                        continue
+
+                    temp_indexes[col] = f"{table_info['index_files'][col]}.temp"
+                    if os.path.exists(temp_indexes[col]):
+                        os.remove(temp_indexes[col])  # Left by a failed compaction
+                    # Opening the missing index file builds it from the records of the data file
+                    IndexFactory.get_index(
+                        index_type='bplus',  # Currently hardcoded as we only support B+ trees
+                        index_filename=temp_indexes[col],
+                        data_filename=temp_data_file,
+                        data_format=table_info["format_str"],
+                        key_position=col_idx + 1  # +1 to account for deletion marker
+                    )
+            finally:
+                # The instances were made for the temporary files
+                IndexFactory.forget(*temp_indexes.values())
 
             # Update table info
             table_info["stats"]["total_records"] = new_record_count
@@ -95,6 +82,7 @@ class TableCompactor:
             os.replace(temp_data_file, table_info["data_file"])
             for col, temp_idx_file in temp_indexes.items():
                 os.replace(temp_idx_file, table_info["index_files"][col])
+            IndexFactory.forget(*table_info["index_files"].values())
                 
             # Save updated table info
             self.table_manager._save_table_info(table_name, table_info)
@@ -1,12 +1,25 @@
 import os
 import json
 import struct
-from typing import Dict, Any, Optional, List
+import logging
+from typing import Dict, Any, Optional, List, Tuple
+import numpy as np
 from ..cursors.line_cursor import LineCursor
+from ..index_handling.index_factory import IndexFactory
+
+logger = logging.getLogger(__name__)
+
+# Compiled record structs, shared by every table with the same format string
+_RECORD_STRUCTS = {}
+
+# NumPy record dtypes, keyed by the column names and types they were built for
+_RECORD_DTYPES = {}
 
 class TableManager:
     # Constant for deletion marker size (1 byte for deleted flag)
     DELETION_MARKER_SIZE = 1
+    # Name of the deletion marker field in record_dtype, not a valid column name
+    DELETION_MARKER_FIELD = "#deleted"
 
     def __init__(self, data_dir: str):
         # Use src/data as the base directory
@@ -20,7 +33,7 @@ class TableManager:
         table_dir = os.path.join(self.data_dir, table_name)
         meta_file = os.path.join(table_dir, "meta.json")
         exists = os.path.exists(meta_file)
-        print(f"[DEBUG] table_exists check for {table_name}: {exists}")  # DEBUG
+        logger.debug("table_exists check for %s: %s", table_name, exists)
         return exists
     
     def get_table_info(self, table_name: str) -> Optional[Dict[str, Any]]:
@@ -36,7 +49,8 @@ class TableManager:
         with open(meta_file, 'r') as f:
             return json.load(f)
     
-    def create_table(self, table_name: str, columns: List[Dict], indexes: Dict = None, primary_key: str = None) -> Dict:
+    def create_table(self, table_name: str, columns: List[Dict], indexes: Dict = None, primary_key: str = None,
+                     pk_monotonic: bool = False) -> Dict:
         # Convert table name to lowercase
         table_name = table_name.lower()
         
@@ -65,6 +79,7 @@ class TableManager:
                 "data_file": os.path.join(table_dir, "data.bin"),
                 "indexes": indexes or {},
                 "primary_key": primary_key,
+                "pk_monotonic": pk_monotonic,  # Hint that primary keys are inserted in increasing order
                 "index_files": {
                     col: os.path.join(table_dir, f"{col}_{index_type}.idx")
                     for col, index_type in (indexes or {}).items()
@@ -72,7 +87,8 @@ class TableManager:
                 "stats": {
                     "total_records": 0,
                     "deleted_records": 0,
-                    "last_compaction": None
+                    "last_compaction": None,
+                    "last_pk": None  # Largest primary key inserted, kept for MONOTONIC tables
                 }
             }
             
@@ -83,7 +99,8 @@ class TableManager:
             with open(table_info["data_file"], 'wb') as f:
                 pass
                 
-            # Create empty index files
+            # Create empty index files, a table dropped under the same name may have left instances behind
+            IndexFactory.forget(*table_info["index_files"].values())
             for col, index_type in (indexes or {}).items():
                 index_file = table_info["index_files"][col]
                 with open(index_file, 'wb') as f:
@@ -103,14 +120,18 @@ class TableManager:
                 "message": f"Failed to create table: {str(e)}"
             }
 
-    def update_table_stats(self, table_name: str, total_delta: int = 0, deleted_delta: int = 0) -> None:
-        """Update table statistics for record counts"""
+    def update_table_stats(self, table_name: str, total_delta: int = 0, deleted_delta: int = 0,
+                           last_pk: Any = None) -> None:
+        """Update table statistics for record counts, and the largest primary key if last_pk is given"""
         table_info = self.get_table_info(table_name)
         if not table_info:
             return
         
-        table_info["stats"]["total_records"] += total_delta
-        table_info["stats"]["deleted_records"] += deleted_delta
+        stats = table_info["stats"]
+        stats["total_records"] += total_delta
+        stats["deleted_records"] += deleted_delta
+        if last_pk is not None and (stats.get("last_pk") is None or last_pk > stats["last_pk"]):
+            stats["last_pk"] = last_pk
         self._save_table_info(table_name, table_info)
 
     def should_compact(self, table_name: str) -> bool:
@@ -135,9 +156,80 @@ class TableManager:
         table_dir = os.path.join(self.data_dir, table_name)
         meta_file = os.path.join(table_dir, "meta.json")
         
+        # Keys starting with "_" are runtime caches derived from the metadata
         with open(meta_file, 'w') as f:
-            json.dump(table_info, f, indent=2)
+            json.dump({k: v for k, v in table_info.items() if not k.startswith('_')}, f, indent=2)
+
+    @staticmethod
+    def column_positions(table_info: Dict[str, Any]) -> Dict[str, int]:
+        """Map each column name to its position in the schema (cached on table_info)"""
+        positions = table_info.get("_column_positions")
+        if positions is None:
+            positions = {c["name"]: i for i, c in enumerate(table_info["columns"])}
+            table_info["_column_positions"] = positions
+        return positions
+
+    @staticmethod
+    def record_struct(table_info: Dict[str, Any]) -> struct.Struct:
+        """Compiled struct for the table's record format"""
+        # Keyed by format string so it outlives table_info, which is reloaded per query
+        format_str = table_info["format_str"]
+        record_struct = _RECORD_STRUCTS.get(format_str)
+        if record_struct is None:
+            record_struct = _RECORD_STRUCTS[format_str] = struct.Struct(format_str)
+        return record_struct
     
+    @staticmethod
+    def record_dtype(table_info: Dict[str, Any]) -> np.dtype:
+        """
+        NumPy structured dtype laid out like the record struct: the deletion marker,
+        then one field per column named after it, so whole chunks of records can be
+        viewed as arrays and compared column by column.
+        """
+        key = tuple((c["name"], c["type"]) for c in table_info["columns"])
+        record_dtype = _RECORD_DTYPES.get(key)
+        if record_dtype is None:
+            fields = [(TableManager.DELETION_MARKER_FIELD, 'u1')]
+            for name, col_type in key:
+                if col_type == "INT":
+                    fields.append((name, '=i4'))
+                elif col_type.startswith("VARCHAR"):
+                    size = int(col_type.split('[')[1].split(']')[0])
+                    fields.append((name, f'S{size}'))
+                elif col_type == "DATE":
+                    fields.append((name, '=u4'))
+                elif col_type == "FLOAT":
+                    fields.append((name, '=f4'))
+                elif col_type == "ARRAY[FLOAT]":
+                    fields.append((name, '=f4', (2,)))
+            record_dtype = _RECORD_DTYPES[key] = np.dtype(fields)
+        return record_dtype
+
+    def mark_deleted(self, table_info: Dict[str, Any], record_pos: int) -> Optional[bool]:
+        """
+        Set the deletion marker of a record in place, touching only that byte.
+        Returns True if it was marked, False if it was already deleted, None if there is no such record.
+        """
+        offset = record_pos * self.record_struct(table_info).size
+        fd = os.open(table_info["data_file"], os.O_RDWR)
+        try:
+            marker = os.pread(fd, self.DELETION_MARKER_SIZE, offset)
+            if not marker:
+                return None
+            if marker == b'\x01':
+                return False
+            os.pwrite(fd, b'\x01', offset)
+            return True
+        finally:
+            os.close(fd)
+
+    def column_layout(self, table_info: Dict[str, Any], col_idx: int) -> Tuple[int, struct.Struct]:
+        """Byte offset of a column inside a record and the struct of its field(s)"""
+        columns = table_info["columns"]
+        preceding = self._create_format_string(columns[:col_idx])[1:]
+        offset = struct.calcsize('=' + 'x' * self.DELETION_MARKER_SIZE + preceding)
+        return offset, struct.Struct(self._create_format_string([columns[col_idx]]))
+
     def _create_format_string(self, columns: list) -> str:
         """Create struct format string from column definitions"""
         format_parts = ['=']  # Use native byte order
@@ -184,6 +276,36 @@ class TableManager:
                 "message": f"Failed to append record: {str(e)}"
             }
 
+    def append_records_bulk(self, table_name: str, buffer: bytes) -> Dict[str, Any]:
+        """Append a buffer of packed records (deletion marker included) with a single write"""
+        table_info = self.get_table_info(table_name)
+        if not table_info:
+            return {
+                "status": "error",
+                "message": f"Table {table_name} not found"
+            }
+
+        try:
+            fd = os.open(table_info["data_file"], os.O_WRONLY | os.O_APPEND)
+            try:
+                offset = os.lseek(fd, 0, os.SEEK_END)
+                view = memoryview(buffer)
+                # os.write may write less than requested, keep going until done
+                while view:
+                    written = os.write(fd, view)
+                    view = view[written:]
+            finally:
+                os.close(fd)
+            return {
+                "status": "success",
+                "offset": offset
+            }
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": f"Failed to append records: {str(e)}"
+            }
+
     def get_all_tables(self) -> List[str]:
         """Get list of all available tables by checking directories in data folder"""
         try:
@@ -193,5 +315,5 @@ class TableManager:
                 if os.path.isdir(os.path.join(self.data_dir, d))
             ])
         except Exception as e:
-            print(f"Error getting tables: {str(e)}")
+            logger.error("Error getting tables: %s", e)
             return []
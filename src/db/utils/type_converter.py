@@ -1,82 +1,257 @@
 import struct
 from datetime import datetime
-from typing import Any, List
+from typing import Any, Callable, Dict, List, Optional
+
+def _to_timestamp(value: str) -> int:
+    dt = datetime.strptime(value, '%Y-%m-%d')
+    return int(dt.timestamp())
+
+def _to_point(value: str) -> tuple:
+    x, y = map(float, value.split(','))
+    return (x, y)
+
+def _unchanged(value: Any) -> Any:
+    return value
+
+def _from_timestamp(value: int) -> str:
+    return datetime.fromtimestamp(value).strftime('%Y-%m-%d')
+
+def _point_to_str(x: float, y: float) -> str:
+    return f"{x},{y}"
+
+# Converter for each column type, built on first use
+_CONVERTERS = {}
+
+# Generated record converters, keyed by the column types they were built for
+_RECORD_CONVERTERS = {}
+
+# Generated record decoders, keyed by the column types they were built for
+_RECORD_DECODERS = {}
+
+# Index keys are 8 bytes, compared as raw bytes by the B+ tree. Numbers are encoded
+# big-endian with the sign flipped, so the byte order is the numeric order
+INDEX_KEY_SIZE = 8
+_KEY_SIGN_BIT = 1 << 63
+_KEY_MASK = (1 << 64) - 1
+_UINT_KEY = struct.Struct('>Q')
+_DOUBLE_BITS = struct.Struct('>d')
+
+# FLOAT columns are stored as 4-byte floats
+_FLOAT_FIELD = struct.Struct('=f')
+
+# Tables loaded from CSV files by older versions start every VARCHAR value with
+# four null bytes and the row number, as the UTF-8 of four latin-1 characters
+_LEGACY_VARCHAR_PREFIX = b'\x00\x00\x00\x00'
+
+def strip_varchar_prefix(field: bytes) -> bytes:
+    """Stored VARCHAR bytes without the row number prefix of older CSV loads, unchanged if it has none"""
+    if not field.startswith(_LEGACY_VARCHAR_PREFIX):
+        return field
+    # Each of the four row number characters takes one or two UTF-8 bytes
+    pos = 4
+    for _ in range(4):
+        if pos >= len(field):
+            break
+        pos += 2 if field[pos] >= 0x80 else 1
+    return field[pos:]
+
+def encode_int_key(value: int) -> bytes:
+    """Index key of an INT or DATE field, raises struct.error outside the signed 64-bit range"""
+    return _UINT_KEY.pack(value + _KEY_SIGN_BIT)
+
+def encode_float_key(value: float) -> bytes:
+    """Index key of a FLOAT field: negative doubles get every bit flipped, the rest only the sign bit"""
+    # -0.0 and 0.0 compare equal, adding 0.0 gives them the same bits
+    bits = _UINT_KEY.unpack(_DOUBLE_BITS.pack(value + 0.0))[0]
+    return _UINT_KEY.pack(bits ^ _KEY_MASK if bits & _KEY_SIGN_BIT else bits | _KEY_SIGN_BIT)
+
+def encode_bytes_key(value: bytes) -> bytes:
+    """Index key of a VARCHAR field: its first bytes, null padded"""
+    return strip_varchar_prefix(value)[:INDEX_KEY_SIZE].ljust(INDEX_KEY_SIZE, b'\x00')
+
+# Key encoder for each column type, built on first use
+_KEY_ENCODERS = {}
 
 class TypeConverter:
+    @staticmethod
+    def get_converter(col_type: str) -> Callable[[Any], Any]:
+        """Return the function converting values of a column type, so callers can resolve it once per column"""
+        converter = _CONVERTERS.get(col_type)
+        if converter is None:
+            if col_type == "INT":
+                converter = int
+            elif col_type == "FLOAT":
+                converter = float
+            elif col_type.startswith("VARCHAR"):
+                size = int(col_type.split('[')[1].split(']')[0])
+                converter = lambda value: value.encode().ljust(size, b'\x00')
+            elif col_type == "DATE":
+                converter = _to_timestamp
+            elif col_type == "ARRAY[FLOAT]":
+                converter = _to_point
+            else:
+                converter = _unchanged
+            _CONVERTERS[col_type] = converter
+        return converter
+
+    @staticmethod
+    def get_key_encoder(col_type: str) -> Callable[[Any], bytes]:
+        """Return the function encoding a converted value of a column type as an index key"""
+        encoder = _KEY_ENCODERS.get(col_type)
+        if encoder is None:
+            if col_type in ("INT", "DATE"):
+                encoder = encode_int_key
+            elif col_type == "FLOAT":
+                encoder = encode_float_key
+            elif col_type.startswith("VARCHAR"):
+                encoder = encode_bytes_key
+            else:
+                raise ValueError(f"Unsupported key type for index: {col_type}")
+            _KEY_ENCODERS[col_type] = encoder
+        return encoder
+
     @staticmethod
     def convert_value(value: Any, col_type: str) -> Any:
         """Convert a value to its appropriate type based on column definition"""
-        if col_type == "INT":
-            return int(value)
-        elif col_type == "FLOAT":
-            return float(value)
-        elif col_type.startswith("VARCHAR"):
-            size = int(col_type.split('[')[1].split(']')[0])
-            return value.encode().ljust(size, b'\x00')
-        elif col_type == "DATE":
-            dt = datetime.strptime(value, '%Y-%m-%d')
-            return int(dt.timestamp())
-        elif col_type == "ARRAY[FLOAT]":
-            x, y = map(float, value.split(','))
-            return (x, y)
-        else:
-            return value
+        return TypeConverter.get_converter(col_type)(value)
 
     @staticmethod
-    def convert_record(values: List[Any], columns: List[dict], format_str: str) -> bytes:
-        """Convert a list of values to binary record format"""
-        
-        # Convert values to appropriate types
-        converted_values = []
-        # Add deletion marker (0 for not deleted)
-        converted_values.append(b'\x00')  # Add deletion marker first
-        
-        # Convert actual data values
-        for value, col in zip(values, columns):
-            converted = TypeConverter.convert_value(value, col["type"])
-            if isinstance(converted, tuple):
-                converted_values.extend(converted)
-            else:
-                converted_values.append(converted)
+    def to_field_value(value: Any, col_type: str) -> Any:
+        """
+        Convert a query operand to the value the record struct unpacks for a column,
+        so scans can compare the raw field directly. Raises ValueError for column
+        types without a single comparable field or operands that do not convert.
+        """
+        if col_type == "FLOAT":
+            # Round to what the column can store
+            try:
+                return _FLOAT_FIELD.unpack(_FLOAT_FIELD.pack(float(value)))[0]
+            except struct.error as e:
+                raise ValueError(str(e))
+        if col_type in ("INT", "DATE") or col_type.startswith("VARCHAR"):
+            return TypeConverter.convert_value(value, col_type)
+        raise ValueError(f"No native comparison for column type: {col_type}")
+
+    @staticmethod
+    def to_index_key(value: Any, col_type: str) -> bytes:
+        """
+        Encode a query operand as the B+ tree key of a column, the same bytes the tree
+        builds from the stored field. Raises ValueError for operands that do not convert.
+        """
+        field_value = TypeConverter.to_field_value(value, col_type)
+        try:
+            return TypeConverter.get_key_encoder(col_type)(field_value)
+        except struct.error as e:
+            raise ValueError(str(e))
+
+    @staticmethod
+    def compile_record_converter(columns: List[dict]) -> Callable[[List[Any]], List[Any]]:
+        """
+        Build convert(values) for a schema: it returns the flat list of fields packed
+        by the record struct, deletion marker first. The source is generated once per
+        schema so there is no per-value type dispatch.
+        """
+        key = tuple(col["type"] for col in columns)
+        converter = _RECORD_CONVERTERS.get(key)
+        if converter:
+            return converter
+
+        fields = ["b'\\x00'"]  # Deletion marker (0 for not deleted)
+        namespace = {}
+        for i, col_type in enumerate(key):
+            namespace[f"c{i}"] = TypeConverter.get_converter(col_type)
+            # Points convert to a tuple, one field per coordinate
+            star = "*" if col_type == "ARRAY[FLOAT]" else ""
+            fields.append(f"{star}c{i}(values[{i}])")
+
+        source = f"def convert(values):\n    return [{', '.join(fields)}]\n"
+        exec(source, namespace)
+        converter = _RECORD_CONVERTERS[key] = namespace["convert"]
+        return converter
+
+    @staticmethod
+    def _record_values(values: List[Any], columns: List[dict]) -> List[Any]:
+        """Convert a row to the flat list of fields packed by the record struct"""
+        return TypeConverter.compile_record_converter(columns)(values)
+
+    @staticmethod
+    def convert_record(values: List[Any], columns: List[dict], format_str: str,
+                       record_struct: Optional[struct.Struct] = None) -> bytes:
+        """Convert a list of values to binary record format, packing with record_struct if given"""
+        converted_values = TypeConverter._record_values(values, columns)
 
         # Pack into binary format
+        if record_struct is not None:
+            return record_struct.pack(*converted_values)
         return struct.pack(format_str, *converted_values)
 
     @staticmethod
-    def bytes_to_values(raw_record: bytes, format_str: str, columns: List[dict]) -> List[Any]:
-        """Convert a binary record back to Python values"""
-        # Unpack raw bytes into tuple of values
-        values = struct.unpack(format_str, raw_record)
-        
-        # Convert each value back to its Python type, skipping deletion marker
-        result = []
+    def pack_record_into(values: List[Any], columns: List[dict], record_struct: struct.Struct,
+                         buffer: bytearray, offset: int) -> None:
+        """Convert a list of values and pack the record straight into buffer at offset"""
+        record_struct.pack_into(buffer, offset, *TypeConverter._record_values(values, columns))
+
+    @staticmethod
+    def compile_record_decoder(columns: List[dict]) -> Callable[[tuple], List[Any]]:
+        """
+        Build decode(values) for a schema: it takes the fields unpacked by the record
+        struct, deletion marker first, and returns the row's Python values. Like the
+        record converter, the source is generated once per schema.
+        """
+        key = tuple(col["type"] for col in columns)
+        decoder = _RECORD_DECODERS.get(key)
+        if decoder:
+            return decoder
+
+        fields = TypeConverter._decoded_fields(key)
+        source = f"def decode(values):\n    return [{', '.join(fields)}]\n"
+        namespace = {"from_timestamp": _from_timestamp, "point_to_str": _point_to_str,
+                     "strip_varchar_prefix": strip_varchar_prefix}
+        exec(source, namespace)
+        decoder = _RECORD_DECODERS[key] = namespace["decode"]
+        return decoder
+
+    @staticmethod
+    def compile_field_predicate(columns: List[dict], col_idx: int, expression: str,
+                                constants: Dict[str, Any]) -> Callable[[tuple], bool]:
+        """
+        Build predicate(values) over an unpacked record from a source expression in which
+        {field} stands for column col_idx, decoded inline, and the names in constants are
+        bound to their values. Generated per query, so the literals are baked in.
+        """
+        field = TypeConverter._decoded_fields(tuple(col["type"] for col in columns))[col_idx]
+        source = f"def predicate(values):\n    return {expression.format(field=field)}\n"
+        namespace = {"from_timestamp": _from_timestamp, "point_to_str": _point_to_str,
+                     "strip_varchar_prefix": strip_varchar_prefix, **constants}
+        exec(source, namespace)
+        return namespace["predicate"]
+
+    @staticmethod
+    def _decoded_fields(col_types: tuple) -> List[str]:
+        """Source expression decoding each column from the unpacked fields in values"""
+        fields = []
         value_idx = 1  # Skip deletion marker
-        
-        for col in columns:
-            col_type = col["type"]
-            
-            if col_type == "INT":
-                result.append(values[value_idx])
-                value_idx += 1
-            elif col_type == "FLOAT":
-                result.append(values[value_idx])
-                value_idx += 1
-            elif col_type.startswith("VARCHAR"):
-                # Convert bytes to string and strip null bytes
-                str_val = values[value_idx].rstrip(b'\x00').decode()
-                result.append(str_val)
-                value_idx += 1
+        for col_type in col_types:
+            if col_type.startswith("VARCHAR"):
+                # Convert bytes to string and strip null bytes (and the prefix of older CSV loads)
+                fields.append(f"strip_varchar_prefix(values[{value_idx}]).rstrip(b'\\x00').decode()")
             elif col_type == "DATE":
-                # Convert timestamp to date string
-                dt = datetime.fromtimestamp(values[value_idx])
-                result.append(dt.strftime('%Y-%m-%d'))
-                value_idx += 1
+                fields.append(f"from_timestamp(values[{value_idx}])")
             elif col_type == "ARRAY[FLOAT]":
-                # Combine two floats into coordinate tuple
-                result.append(f"{values[value_idx]},{values[value_idx + 1]}")
-                value_idx += 2
-            else:
-                result.append(values[value_idx])
+                # Two floats back to the "x,y" text they were parsed from
+                fields.append(f"point_to_str(values[{value_idx}], values[{value_idx + 1}])")
                 value_idx += 1
-                
-        return result 
\ No newline at end of file
+            else:
+                fields.append(f"values[{value_idx}]")
+            value_idx += 1
+        return fields
+
+    @staticmethod
+    def bytes_to_values(raw_record: bytes, format_str: str, columns: List[dict],
+                        record_struct: Optional[struct.Struct] = None) -> List[Any]:
+        """Convert a binary record back to Python values, unpacking with record_struct if given"""
+        if record_struct is not None:
+            values = record_struct.unpack(raw_record)
+        else:
+            values = struct.unpack(format_str, raw_record)
+        return TypeConverter.compile_record_decoder(columns)(values) 
\ No newline at end of file
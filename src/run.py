@@ -1,5 +1,9 @@
+import logging
 from api import create_app
 
+# Log at INFO so engine debug messages are never formatted
+logging.basicConfig(level=logging.INFO)
+
 app = create_app()
 
 if __name__ == '__main__':
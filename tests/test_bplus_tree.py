@@ -0,0 +1,321 @@
+import multiprocessing
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from db.cursors import BlockCursor
+from db.index_handling.implementations.bplus_tree import BPlusTreeIndex, LeafPage, PAGE_SIZE
+from db.utils.type_converter import TypeConverter
+
+
+def key(n):
+    # Big-endian so the byte order the tree sorts by is the numeric order
+    return n.to_bytes(8, "big")
+
+
+def insert_keys(index_filename, data_filename, numbers):
+    """Insert keys through an instance of another process"""
+    tree = BPlusTreeIndex(index_filename, data_filename, "=q")
+    for n in numbers:
+        tree.insert_key_and_position(key(n), n)
+
+
+class BPlusTreeTestCase(unittest.TestCase):
+    """Trees with tiny pages, so a few hundred keys make them several levels deep"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.tree = BPlusTreeIndex(
+            os.path.join(self.tmp, "test.idx"), os.path.join(self.tmp, "test.bin"), "=q")
+        self.tree.leaf_capacity = 4
+        self.tree.internal_capacity = 3
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def check_structure(self):
+        """
+        Assert the tree invariants and return its leaf entries in key order:
+        parent ids, page capacities, keys sorted and within their separators,
+        every leaf at the same depth and chained to the next one.
+        """
+        tree = self.tree
+        leaves = []
+        with BlockCursor(tree.index_filename, PAGE_SIZE) as cursor:
+            def walk(block, parent, low, high, depth):
+                page = tree._parse_page(cursor.read_block(block))
+                self.assertEqual(page.parent_id, parent)
+                if page.is_leaf:
+                    keys = [k for k, _ in page.key_value_pairs]
+                    self.assertLessEqual(len(keys), tree.leaf_capacity)
+                    leaves.append((depth, page))
+                else:
+                    keys = page.keys
+                    self.assertLessEqual(len(keys), tree.internal_capacity)
+                    self.assertEqual(len(page.pointers), len(keys) + 1)
+                self.assertEqual(keys, sorted(keys))
+                if keys:
+                    self.assertTrue(low is None or keys[0] >= low)
+                    self.assertTrue(high is None or keys[-1] <= high)
+                if not page.is_leaf:
+                    bounds = [low] + page.keys + [high]
+                    for i, child in enumerate(page.pointers):
+                        walk(child, block, bounds[i], bounds[i + 1], depth + 1)
+
+            walk(tree.root_block, -1, None, None, 0)
+
+        self.assertEqual(len({depth for depth, _ in leaves}), 1)
+        pages = [page for _, page in leaves]
+        for page, following in zip(pages, pages[1:]):
+            self.assertEqual(page.next_leaf, following.page_id)
+        self.assertLess(pages[-1].next_leaf, 0)
+        return [entry for page in pages for entry in page.key_value_pairs]
+
+    def height(self):
+        levels = 1
+        with BlockCursor(self.tree.index_filename, PAGE_SIZE) as cursor:
+            page = self.tree._parse_page(cursor.read_block(self.tree.root_block))
+            while not page.is_leaf:
+                levels += 1
+                page = self.tree._parse_page(cursor.read_block(page.pointers[0]))
+        return levels
+
+
+class TestSplits(BPlusTreeTestCase):
+    def test_ascending_inserts_split_up_to_the_root(self):
+        roots = {self.tree.root_block}
+        for n in range(200):
+            self.tree.insert_key_and_position(key(n), n)
+            roots.add(self.tree.root_block)
+
+        self.assertGreaterEqual(self.height(), 4)
+        self.assertGreaterEqual(len(roots), 4)  # Every new level is a new root
+        self.assertEqual(self.check_structure(), [(key(n), n) for n in range(200)])
+        for n in range(200):
+            self.assertEqual(self.tree.search(key(n)), n)
+
+    def test_random_inserts_keep_the_tree_valid(self):
+        numbers = list(range(500))
+        random.Random(7).shuffle(numbers)
+        for n in numbers:
+            self.tree.insert_key_and_position(key(n), n)
+
+        self.assertGreaterEqual(self.height(), 4)
+        self.assertEqual(self.check_structure(), [(key(n), n) for n in range(500)])
+        for n in range(500):
+            self.assertEqual(self.tree.search(key(n)), n)
+        self.assertIsNone(self.tree.search(key(500)))
+
+    def test_index_reopened_from_disk_finds_every_key(self):
+        for n in range(100):
+            self.tree.insert_key_and_position(key(n), n)
+
+        reopened = BPlusTreeIndex(self.tree.index_filename, self.tree.data_filename, "=q")
+        self.assertEqual(reopened.root_block, self.tree.root_block)
+        for n in range(100):
+            self.assertEqual(reopened.search(key(n)), n)
+
+
+class TestAddSorted(BPlusTreeTestCase):
+    def test_into_empty_tree(self):
+        self.tree.add_sorted([(key(n), n) for n in range(150)])
+
+        self.assertGreaterEqual(self.height(), 3)
+        self.assertEqual(self.check_structure(), [(key(n), n) for n in range(150)])
+
+    def test_into_non_empty_tree(self):
+        # Odd keys first, then the even ones land between them in every leaf
+        for n in range(1, 300, 2):
+            self.tree.insert_key_and_position(key(n), n)
+        self.tree.add_sorted([(key(n), n) for n in range(0, 300, 2)])
+
+        self.assertEqual(self.check_structure(), [(key(n), n) for n in range(300)])
+        for n in range(300):
+            self.assertEqual(self.tree.search(key(n)), n)
+
+    def test_sparse_batch_goes_to_each_entry_leaf(self):
+        # Leaves with room left must not take the entries of the leaves after them
+        for n in range(1, 300, 2):
+            self.tree.insert_key_and_position(key(n), n)
+        batch = [0, 100, 200, 300, 301]
+        self.tree.add_sorted([(key(n), n) for n in batch])
+
+        expected = sorted([(key(n), n) for n in range(1, 300, 2)] + [(key(n), n) for n in batch])
+        self.assertEqual(self.check_structure(), expected)
+        for n in batch:
+            self.assertEqual(self.tree.search(key(n)), n)
+
+    def test_duplicate_keys_keep_insertion_order(self):
+        for n in range(40):
+            self.tree.insert_key_and_position(key(n), n)
+        self.tree.add_sorted([(key(20), 100 + i) for i in range(10)])
+
+        entries = self.check_structure()
+        self.assertEqual([ptr for k, ptr in entries if k == key(20)], [20] + list(range(100, 110)))
+        self.assertEqual(len(entries), 50)
+
+
+class TestSearchMany(BPlusTreeTestCase):
+    def setUp(self):
+        super().setUp()
+        for n in range(0, 200, 2):
+            self.tree.insert_key_and_position(key(n), n)
+
+    def test_finds_present_keys_only(self):
+        wanted = [key(n) for n in range(0, 60)]
+        self.assertEqual(self.tree.search_many(wanted), {key(n): n for n in range(0, 60, 2)})
+
+    def test_keys_past_either_end(self):
+        self.assertEqual(self.tree.search_many([key(0), key(198), key(199), key(10 ** 6)]),
+                         {key(0): 0, key(198): 198})
+        self.assertEqual(self.tree.search_many([]), {})
+
+    def test_skips_deleted_entries(self):
+        self.assertTrue(self.tree.mark_deleted(key(10), 10))
+        self.assertTrue(self.tree.mark_deleted(key(150), 150))
+
+        found = self.tree.search_many([key(8), key(10), key(12), key(150)])
+        self.assertEqual(found, {key(8): 8, key(12): 12})
+        self.assertIsNone(self.tree.search(key(10)))
+
+    def test_finds_a_deleted_key_inserted_again(self):
+        self.tree.mark_deleted(key(10), 10)
+        self.tree.insert_key_and_position(key(10), 500)
+
+        self.assertEqual(self.tree.search_many([key(10)]), {key(10): 500})
+        self.assertEqual(self.tree.search(key(10)), 500)
+
+
+class TestMarkDeleted(BPlusTreeTestCase):
+    def setUp(self):
+        super().setUp()
+        # Twelve entries of one key spread over several leaves
+        numbers = list(range(60)) + [30] * 11
+        random.Random(3).shuffle(numbers)
+        self.pointers = []
+        for ptr, n in enumerate(numbers):
+            self.tree.insert_key_and_position(key(n), ptr)
+            if n == 30:
+                self.pointers.append(ptr)
+
+    def test_entries_spilled_over_several_leaves(self):
+        self.assertEqual(sum(1 for k, _ in self.check_structure() if k == key(30)), 12)
+        with BlockCursor(self.tree.index_filename, PAGE_SIZE) as cursor:
+            self.assertGreater(len(list(self.tree._leaves_with_key(cursor, key(30)))), 2)
+        for ptr in self.pointers:
+            self.assertTrue(self.tree.mark_deleted(key(30), ptr))
+            self.assertFalse(self.tree.mark_deleted(key(30), ptr))
+
+        self.assertIsNone(self.tree.search(key(30)))
+        self.assertTrue(self.tree.is_deleted(key(30)))
+        self.assertEqual(self.check_structure().count((key(30), ~self.pointers[0])), 1)
+
+    def test_is_deleted(self):
+        self.assertFalse(self.tree.is_deleted(key(30)))
+        self.assertFalse(self.tree.is_deleted(key(1000)))  # No entries at all
+
+        self.tree.mark_deleted(key(31), self.tree.search(key(31)))
+        self.assertTrue(self.tree.is_deleted(key(31)))
+        self.tree.insert_key_and_position(key(31), 999)
+        self.assertFalse(self.tree.is_deleted(key(31)))
+        self.assertEqual(self.tree.search(key(31)), 999)
+
+
+class TestSharedFile(unittest.TestCase):
+    """An instance kept open while another process writes the same file, like cached instances of two servers"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.index_filename = os.path.join(self.tmp, "test.idx")
+        self.data_filename = os.path.join(self.tmp, "test.bin")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def insert_in_another_process(self, numbers):
+        process = multiprocessing.Process(
+            target=insert_keys, args=(self.index_filename, self.data_filename, numbers))
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+
+    def test_root_split_by_another_process(self):
+        tree = BPlusTreeIndex(self.index_filename, self.data_filename, "=q")
+        tree.insert_key_and_position(key(0), 0)
+        old_root = tree.root_block
+
+        # Enough keys to split the root leaf a few times
+        self.insert_in_another_process(list(range(1, 1000)))
+        for n in range(1000):
+            self.assertEqual(tree.search(key(n)), n)
+        self.assertNotEqual(tree.root_block, old_root)
+
+        tree.insert_key_and_position(key(1000), 1000)
+        self.insert_in_another_process(list(range(1001, 1500)))
+        reopened = BPlusTreeIndex(self.index_filename, self.data_filename, "=q")
+        found = reopened.search_many([key(n) for n in range(1500)])
+        self.assertEqual(found, {key(n): n for n in range(1500)})
+        self.assertEqual(tree.range_search(key(990), key(1010)), list(range(990, 1011)))
+
+
+class TestKeyFormat(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.index_filename = os.path.join(self.tmp, "test.idx")
+        self.data_filename = os.path.join(self.tmp, "test.bin")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_keys_sort_like_their_values(self):
+        ints = [-2 ** 63, -256, -1, 0, 1, 255, 256, 2 ** 63 - 1]
+        floats = [float("-inf"), -1e300, -2.5, -1e-300, 0.0, 1e-300, 2.5, 1e300, float("inf")]
+        for col_type, values in (("INT", ints), ("FLOAT", floats)):
+            keys = [TypeConverter.get_key_encoder(col_type)(v) for v in values]
+            self.assertEqual(sorted(keys), keys)
+
+    def test_range_search_over_negative_and_positive_keys(self):
+        tree = BPlusTreeIndex(self.index_filename, self.data_filename, "=1sq", key_position=1)
+        tree.leaf_capacity = 4
+        tree.internal_capacity = 3
+        numbers = list(range(-100, 100))
+        random.Random(5).shuffle(numbers)
+        for n in numbers:
+            tree.insert_key_and_position(TypeConverter.to_index_key(str(n), "INT"), n + 100)
+
+        found = tree.range_search(TypeConverter.to_index_key("-7", "INT"), TypeConverter.to_index_key("3", "INT"))
+        self.assertEqual(found, [n + 100 for n in range(-7, 4)])
+
+    def test_index_with_an_older_key_format_is_rebuilt(self):
+        record = struct.Struct("=1sq")
+        with open(self.data_filename, "wb") as f:
+            for marker, n in ((b"\x00", -3), (b"\x01", 5), (b"\x00", 7)):
+                f.write(record.pack(marker, n))
+        # Header without a key format, and the empty root an old CSV import left behind
+        with open(self.index_filename, "wb") as f:
+            f.write(struct.pack("=q", 1).ljust(PAGE_SIZE, b"\x00"))
+            f.write(LeafPage(1, -1, [], -1).pack())
+
+        tree = BPlusTreeIndex(self.index_filename, self.data_filename, "=1sq", key_position=1)
+        self.assertEqual(tree.search(TypeConverter.to_index_key("-3", "INT")), 0)
+        self.assertEqual(tree.search(TypeConverter.to_index_key("7", "INT")), 2)
+        self.assertIsNone(tree.search(TypeConverter.to_index_key("5", "INT")))
+        self.assertTrue(tree.is_deleted(TypeConverter.to_index_key("5", "INT")))
+        self.assertFalse(os.path.exists(self.index_filename + ".build"))
+
+        # Rebuilt once, opening it again keeps the tree
+        with open(self.index_filename, "rb") as f:
+            rebuilt = f.read()
+        BPlusTreeIndex(self.index_filename, self.data_filename, "=1sq", key_position=1)
+        with open(self.index_filename, "rb") as f:
+            self.assertEqual(f.read(), rebuilt)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from db.commands import create
+from db.commands.create import CreateCommand
+from db.commands.select import SelectCommand
+from db.index_handling.index_factory import IndexFactory
+from db.storage_management.table_manager import TableManager
+
+
+class TestCreateFromFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.table_manager = TableManager(self.tmp)
+        self.table_manager.data_dir = self.tmp  # Keep the tables out of src/data
+        self.tables = []
+        # Several inference chunks even for a few rows
+        patcher = mock.patch.object(create, "INFERENCE_CHUNK_ROWS", 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        for table_name in self.tables:
+            IndexFactory.forget(*self.table_manager.get_table_info(table_name)["index_files"].values())
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def load_csv(self, text, **options):
+        file_path = os.path.join(self.tmp, "items.csv")
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        result = CreateCommand(self.table_manager).execute(
+            {"table_name": "items", "from_file": True, "file_path": file_path, "index_info": {}, **options})
+        if self.table_manager.get_table_info("items"):
+            self.tables.append("items")
+        return result
+
+    def column_types(self):
+        return {col["name"]: col["type"] for col in self.table_manager.get_table_info("items")["columns"]}
+
+    def select(self):
+        return SelectCommand(self.table_manager).execute({"table_name": "items"})["records"]
+
+    def test_rows_past_the_first_chunk_widen_the_schema(self):
+        long_name = "a much longer name than the first ones"
+        rows = ["1,ann,2,2020-01-02", "2,bob,5,2021-03-04", "3,cid,7,2022-05-06",
+                f"4,{long_name},3.75,n/a", "5,žofié,1,2023-07-08"]
+        result = self.load_csv("id,name,qty,day\n" + "\n".join(rows) + "\n")
+        self.assertEqual(result["status"], "success")
+
+        types = self.column_types()
+        self.assertEqual(types["qty"], "FLOAT")
+        self.assertTrue(types["day"].startswith("VARCHAR"))
+        self.assertGreaterEqual(int(types["name"][8:-1]), len(long_name))
+        self.assertEqual(self.select(), [
+            [1, "ann", 2.0, "2020-01-02"], [2, "bob", 5.0, "2021-03-04"], [3, "cid", 7.0, "2022-05-06"],
+            [4, long_name, 3.75, "n/a"], [5, "žofié", 1.0, "2023-07-08"]])
+
+    def test_varchar_holds_values_longer_than_the_padding_cap(self):
+        long_value = "x" * 300
+        result = self.load_csv(f"id,text\n1,short\n2,{long_value}\n")
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(self.column_types()["text"], "VARCHAR[300]")
+        self.assertEqual(self.select(), [[1, "short"], [2, long_value]])
+
+    def test_short_rows_load_empty_numbers_as_zero(self):
+        result = self.load_csv("id,qty\n1,4\n2\n3,6\n")
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(self.select(), [[1, 4], [2, 0], [3, 6]])
+
+    def test_value_that_does_not_fit_a_given_type_fails_the_load(self):
+        columns = [{"name": "id", "type": "INT"}, {"name": "qty", "type": "INT"}]
+        result = self.load_csv("id,qty\n1,4\n2,5\n3,n/a\n", columns=columns)
+        self.assertEqual(result["status"], "error")
+        self.assertIn("row 3", result["message"])
+        self.assertIn("'n/a' is not an INT", result["message"])
+
+    def test_value_longer_than_a_hinted_varchar_fails_the_load(self):
+        result = self.load_csv("id,name\n1,ann\n2,žofia\n", dtype_hints={"name": "VARCHAR[5]"})
+        self.assertEqual(result["status"], "error")
+        self.assertIn("row 2", result["message"])
+        self.assertIn("longer than VARCHAR[5]", result["message"])
+
+
+if __name__ == "__main__":
+    unittest.main()
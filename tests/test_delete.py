@@ -0,0 +1,154 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from db.commands.create import CreateCommand
+from db.commands.delete import DeleteCommand
+from db.commands.insert import InsertCommand, InsertCursor
+from db.commands.select import SelectCommand
+from db.index_handling.index_factory import IndexFactory
+from db.storage_management.table_manager import TableManager
+
+
+class DeleteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.table_manager = TableManager(self.tmp)
+        self.table_manager.data_dir = self.tmp  # Keep the tables out of src/data
+        result = CreateCommand(self.table_manager).execute({
+            "table_name": "people",
+            "columns": [
+                {"name": "id", "type": "INT"},
+                {"name": "name", "type": "VARCHAR[10]"},
+                {"name": "age", "type": "INT"},
+            ],
+            "indexes": {"age": "bplus"},
+            "primary_key": "id",
+        })
+        self.assertEqual(result["status"], "success")
+        with InsertCursor(self.table_manager, "people") as cursor:
+            for row in (["1", "ann", "30"], ["2", "bob", "25"], ["3", "cid", "30"]):
+                cursor.put(row)
+
+    def tearDown(self):
+        IndexFactory.forget(*self.table_manager.get_table_info("people")["index_files"].values())
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def select(self, **filter):
+        parsed_query = {"table_name": "people"}
+        if filter:
+            parsed_query["filters"] = [filter]
+        return SelectCommand(self.table_manager).execute(parsed_query)["records"]
+
+    def delete(self, column, value):
+        return DeleteCommand(self.table_manager).execute({
+            "table_name": "people",
+            "filters": [{"column": column, "operation": "=", "value": value}],
+        })
+
+    def insert(self, *values):
+        return InsertCommand(self.table_manager).execute({"table_name": "people", "values": list(values)})
+
+
+class TestUnflaggedIndexEntries(DeleteTestCase):
+    """Records deleted before DELETE flagged their index entries: only the data file marks them"""
+
+    def setUp(self):
+        super().setUp()
+        # Compaction would drop the deleted records and their entries
+        patcher = mock.patch.object(TableManager, "should_compact", return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        table_info = self.table_manager.get_table_info("people")
+        self.assertTrue(self.table_manager.mark_deleted(table_info, 0))  # id=1, age=30
+
+    def test_delete_again_reports_already_deleted(self):
+        result = self.delete("id", "1")
+        self.assertEqual(result["status"], "success")
+        self.assertIn("already deleted", result["message"])
+        self.assertEqual(self.select(), [[2, "bob", 25], [3, "cid", 30]])
+
+    def test_deleted_primary_key_can_be_inserted_again(self):
+        self.assertEqual(self.insert("1", "eve", "50")["status"], "success")
+        self.assertEqual(self.select(column="id", operation="=", value="1"), [[1, "eve", 50]])
+        self.assertEqual(self.insert("1", "eve", "50")["status"], "error")
+
+    def test_batch_insert_of_a_deleted_primary_key(self):
+        with InsertCursor(self.table_manager, "people") as cursor:
+            cursor.put(["1", "eve", "50"])
+            cursor.put(["4", "dan", "20"])
+        self.assertEqual(self.select(column="id", operation="=", value="1"), [[1, "eve", 50]])
+
+    def test_secondary_index_goes_on_to_the_live_record(self):
+        result = self.delete("age", "30")
+        self.assertEqual(result["status"], "success")
+        self.assertIn("deleted successfully", result["message"])
+        self.assertEqual(self.select(), [[2, "bob", 25]])
+        self.assertIn("already deleted", self.delete("age", "30")["message"])
+
+
+class TestCompaction(DeleteTestCase):
+    """One delete out of three records passes the 20% threshold and compacts the table"""
+
+    def test_indexes_point_at_the_compacted_records(self):
+        with self.assertNoLogs("db.commands.delete", level="ERROR"):
+            self.assertEqual(self.delete("id", "1")["status"], "success")
+
+        table_info = self.table_manager.get_table_info("people")
+        self.assertEqual(table_info["stats"]["deleted_records"], 0)
+        self.assertEqual(os.path.getsize(table_info["data_file"]),
+                         2 * self.table_manager.record_struct(table_info).size)
+        self.assertEqual([name for name in os.listdir(os.path.dirname(table_info["data_file"]))
+                          if name.endswith((".temp", ".build"))], [])
+
+        self.assertEqual(self.select(column="id", operation="=", value="3"), [[3, "cid", 30]])
+        self.assertEqual(self.delete("age", "25")["status"], "success")
+        self.assertEqual(self.select(), [[3, "cid", 30]])
+        self.assertEqual(self.insert("1", "eve", "50")["status"], "success")
+        self.assertEqual(self.insert("3", "eve", "50")["status"], "error")
+
+
+class TestDeleteByScan(DeleteTestCase):
+    """name has no index: DELETE finds its records by searching the mapped data file"""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(TableManager, "should_compact", return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with InsertCursor(self.table_manager, "people") as cursor:
+            # b"al" is also the start of the age field of 27745
+            for row in (["4", "al", "40"], ["5", "al", "41"], ["6", "dan", "27745"]):
+                cursor.put(row)
+        # Record 3 as loaded from CSV by older versions, behind a row number prefix
+        table_info = self.table_manager.get_table_info("people")
+        key_offset, field_struct = self.table_manager.column_layout(table_info, 1)
+        with open(table_info["data_file"], "r+b") as f:
+            f.seek(3 * self.table_manager.record_struct(table_info).size + key_offset)
+            f.write(field_struct.pack(b"\x00" * 4 + (4).to_bytes(4, "little") + b"al"))
+
+    def test_deletes_every_match(self):
+        result = self.delete("name", "al")
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["message"], "2 record(s) with name=al deleted successfully")
+        self.assertEqual(self.select(), [[1, "ann", 30], [2, "bob", 25], [3, "cid", 30], [6, "dan", 27745]])
+        self.assertEqual(self.table_manager.get_table_info("people")["stats"]["deleted_records"], 2)
+
+    def test_deleted_records_are_not_matched_again(self):
+        self.assertEqual(self.delete("name", "bob")["status"], "success")
+        self.assertEqual(self.delete("name", "bob")["status"], "error")
+        self.assertEqual(self.delete("name", "zed")["status"], "error")
+
+    def test_primary_key_of_a_deleted_record_can_be_inserted_again(self):
+        self.assertEqual(self.delete("name", "ann")["status"], "success")
+        self.assertEqual(self.insert("1", "eve", "50")["status"], "success")
+        self.assertEqual(self.select(column="id", operation="=", value="1"), [[1, "eve", 50]])
+
+
+if __name__ == "__main__":
+    unittest.main()
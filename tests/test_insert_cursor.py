@@ -0,0 +1,109 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from db.commands.create import CreateCommand
+from db.commands.insert import InsertCursor
+from db.commands.select import SelectCommand
+from db.index_handling.index_factory import IndexFactory
+from db.storage_management.table_manager import TableManager
+from db.utils.type_converter import TypeConverter
+
+
+class TestInsertCursor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.table_manager = TableManager(self.tmp)
+        self.table_manager.data_dir = self.tmp  # Keep the tables out of src/data
+        result = CreateCommand(self.table_manager).execute({
+            "table_name": "people",
+            "columns": [
+                {"name": "id", "type": "INT"},
+                {"name": "name", "type": "VARCHAR[10]"},
+                {"name": "age", "type": "INT"},
+            ],
+            "indexes": {"age": "bplus"},
+            "primary_key": "id",
+        })
+        self.assertEqual(result["status"], "success")
+
+    def tearDown(self):
+        IndexFactory.forget(*self.table_manager.get_table_info("people")["index_files"].values())
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def select(self, **filter):
+        parsed_query = {"table_name": "people"}
+        if filter:
+            parsed_query["filters"] = [filter]
+        return SelectCommand(self.table_manager).execute(parsed_query)["records"]
+
+    def test_put_flushes_when_the_buffer_fills(self):
+        cursor = InsertCursor(self.table_manager, "people", buffer_size=3)
+        self.assertIsNone(cursor.put(["1", "ann", "30"]))
+        self.assertIsNone(cursor.put(["2", "bob", "25"]))
+        self.assertEqual(self.select(), [])
+
+        result = cursor.put(["3", "cid", "41"])
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(self.select(), [[1, "ann", 30], [2, "bob", 25], [3, "cid", 41]])
+
+    def test_close_inserts_the_remaining_rows(self):
+        with InsertCursor(self.table_manager, "people", buffer_size=2) as cursor:
+            for n in range(5):
+                cursor.put([str(n), f"p{n}", str(20 + n)])
+
+        self.assertEqual(self.select(), [[n, f"p{n}", 20 + n] for n in range(5)])
+        # Both indexes took every batch
+        self.assertEqual(self.select(column="id", operation="=", value="4"), [[4, "p4", 24]])
+        table_info = self.table_manager.get_table_info("people")
+        index = IndexFactory.get_index(
+            "bplus", table_info["index_files"]["age"],
+            data_filename=table_info["data_file"],
+            data_format=table_info["format_str"],
+            key_position=3)
+        self.assertEqual(index.search(TypeConverter.to_index_key("22", "INT")), 2)
+
+    def test_flush_with_an_empty_buffer(self):
+        cursor = InsertCursor(self.table_manager, "people")
+        self.assertEqual(cursor.flush()["status"], "success")
+        self.assertEqual(self.select(), [])
+
+    def test_duplicate_primary_key_within_a_batch(self):
+        cursor = InsertCursor(self.table_manager, "people", buffer_size=10)
+        cursor.put(["1", "ann", "30"])
+        cursor.put(["2", "bob", "25"])
+        cursor.put(["1", "eve", "50"])
+
+        result = cursor.flush()
+        self.assertEqual(result["status"], "error")
+        self.assertIn("appears more than once", result["message"])
+        # The batch is all or nothing, and the buffer was emptied
+        self.assertEqual(self.select(), [])
+        self.assertEqual(cursor.close()["message"], "0 record(s) inserted successfully")
+
+    def test_duplicate_of_an_existing_primary_key(self):
+        with InsertCursor(self.table_manager, "people") as cursor:
+            cursor.put(["1", "ann", "30"])
+
+        cursor = InsertCursor(self.table_manager, "people")
+        cursor.put(["2", "bob", "25"])
+        cursor.put(["1", "eve", "50"])
+        result = cursor.close()
+        self.assertEqual(result["status"], "error")
+        self.assertIn("already exists", result["message"])
+        self.assertEqual(self.select(), [[1, "ann", 30]])
+
+    def test_context_manager_raises_when_the_last_flush_fails(self):
+        with self.assertRaises(Exception):
+            with InsertCursor(self.table_manager, "people") as cursor:
+                cursor.put(["1", "ann", "30"])
+                cursor.put(["1", "ann", "30"])
+        self.assertEqual(self.select(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from db.cursors import line_cursor
+from db.cursors.line_cursor import LineCursor
+
+
+class LineCursorTestCase(unittest.TestCase):
+    RECORDS = 50
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.record_struct = struct.Struct("<ci")
+        self.filename = os.path.join(self.tmp, "records.bin")
+        with open(self.filename, "wb") as f:
+            for n in range(self.RECORDS):
+                f.write(self.record_struct.pack(b"\x00", n * 10))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def cursor(self):
+        return LineCursor(self.filename, self.record_struct.size, self.record_struct)
+
+
+class TestReadValuesSorted(LineCursorTestCase):
+    POSITIONS = [0, 1, 2, 7, 20, 21, 49, 50, 60]
+
+    def expected(self):
+        return [(n, (b"\x00", n * 10)) for n in self.POSITIONS if n < self.RECORDS]
+
+    def test_runs_are_read_with_positional_reads(self):
+        with self.cursor() as c, mock.patch("os.pread", wraps=os.pread) as pread:
+            self.assertEqual(list(c.read_values_sorted(self.POSITIONS)), self.expected())
+        # One read per run of neighbouring positions
+        self.assertEqual(pread.call_count, 5)
+
+    def test_mapped_file(self):
+        with mock.patch.object(line_cursor, "MMAP_MIN_BYTES", 1), self.cursor() as c:
+            self.assertIsNotNone(c._mapped())
+            self.assertEqual(list(c.read_values_sorted(self.POSITIONS)), self.expected())
+
+    def test_sees_the_cursor_own_appends(self):
+        with self.cursor() as c:
+            c.goto_end()
+            c.append_record(self.record_struct.pack(b"\x01", 7))
+            self.assertEqual(list(c.read_values_sorted([self.RECORDS])), [(self.RECORDS, (b"\x01", 7))])
+
+    def test_no_positions(self):
+        with self.cursor() as c:
+            self.assertEqual(list(c.read_values_sorted([])), [])
+
+
+class TestReadRecords(LineCursorTestCase):
+    def test_records_come_in_the_order_asked_for(self):
+        positions = [30, 2, 49, 2, 75, 0, 31]
+        with self.cursor() as c:
+            self.assertEqual(c.read_records(positions),
+                             [(b"\x00", 300), (b"\x00", 20), (b"\x00", 490), (b"\x00", 20),
+                              None, (b"\x00", 0), (b"\x00", 310)])
+
+    def test_file_is_read_in_position_order(self):
+        with self.cursor() as c, mock.patch.object(c, "read_values_sorted",
+                                                   wraps=c.read_values_sorted) as read_values_sorted:
+            c.read_records([5, 3, 4, 3])
+        read_values_sorted.assert_called_once_with([3, 4, 5])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from db.engine.query_handler import QueryHandler
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.handler = QueryHandler(self.tmp)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def assertParsesLikeTheParser(self, query):
+        self.assertEqual(self.handler.parse(query), self.handler.parser.parse(query))
+
+    def test_statements_of_one_template_share_a_parse(self):
+        for value in ("5", "-12", "1.50", "'ann'", "'Alto 2023'", "'2020-01-02'"):
+            self.assertParsesLikeTheParser(f"SELECT * FROM people WHERE age = {value}")
+            self.assertParsesLikeTheParser(f"SELECT * FROM people WHERE name BETWEEN {value} AND 'zz'")
+            self.assertParsesLikeTheParser(f"INSERT INTO people VALUES ({value}, 'bob', 3)")
+            self.assertParsesLikeTheParser(f"DELETE FROM people WHERE id = {value}")
+        self.assertEqual(len(self.handler._templates), 4)
+        self.assertNotIn(None, self.handler._templates.values())
+
+    def test_literals_the_parser_rewrites_stay_in_the_template(self):
+        for value in ("'it''s'", "'back\\\\slash'", "'two\nlines'", "' padded '", "'\"quoted\"'", "'ARRAY[1,2]'"):
+            self.assertParsesLikeTheParser(f"INSERT INTO people VALUES (1, {value}, 3)")
+        self.assertEqual(len(self.handler._templates), 6)
+
+    def test_templates_the_parser_rejects_are_not_cached(self):
+        for query in ("SELECT * FROM t WHERE loc IN (POINT(1, 2), 3)",
+                      "SELECT * FROM t WHERE loc IN (POINT(4, 5), 6.5)",
+                      "SELECT * FROM t WHERE c = x'q'",
+                      "SELECT * FROM t WHERE c = x'longer'"):
+            self.assertParsesLikeTheParser(query)
+        self.assertEqual(set(self.handler._templates.values()), {None})
+
+    def test_each_call_gets_its_own_copy(self):
+        query = "SELECT * FROM people WHERE age = 30"
+        self.handler.parse(query)["filters"][0]["value"] = "changed"
+        self.assertEqual(self.handler.parse(query)["filters"][0]["value"], "30")
+
+
+if __name__ == "__main__":
+    unittest.main()
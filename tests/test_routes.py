@@ -0,0 +1,176 @@
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from api import create_app, routes
+from api.utils import QueryResultCache, ReadWriteLock
+from db.engine.query_handler import QueryHandler
+from db.index_handling.index_factory import IndexFactory
+
+
+class RoutesTestCase(unittest.TestCase):
+    POOL_SIZE = 2
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        pool = queue.Queue()
+        for _ in range(self.POOL_SIZE):
+            pool.put(self.handler())
+        self.writer = self.handler()
+        for name, value in (("reader_pool", pool), ("_writer", self.writer),
+                            ("result_cache", QueryResultCache(maxsize=256, ttl=60))):
+            patcher = mock.patch.object(routes, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = create_app({"TESTING": True}).test_client()
+
+    def tearDown(self):
+        for table_name in self.writer.table_manager.get_all_tables():
+            IndexFactory.forget(*self.writer.table_manager.get_table_info(table_name)["index_files"].values())
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def handler(self):
+        handler = QueryHandler(self.tmp)
+        handler.table_manager.data_dir = self.tmp  # Keep the tables out of src/data
+        return handler
+
+    def query(self, query):
+        response = self.client.post("/api/query", json={"query": query})
+        return response.get_json()
+
+    def create_people(self, table_name="people"):
+        self.assertEqual(self.query(
+            f"CREATE TABLE {table_name} (id INT KEY, name VARCHAR[10], age INT)")["status"], "success")
+        for row in ("1, 'ann', 30", "2, 'bob', 25"):
+            self.assertEqual(self.query(f"INSERT INTO {table_name} VALUES ({row})")["status"], "success")
+
+
+class TestResultCache(RoutesTestCase):
+    def test_spellings_of_a_select_share_an_entry(self):
+        self.create_people()
+        first = self.query("SELECT * FROM people WHERE id = 2")
+        self.assertEqual(first["records"], [[2, "bob", 25]])
+
+        with mock.patch.object(routes, "run_query", side_effect=AssertionError("not cached")):
+            self.assertEqual(self.query("select *  from PEOPLE where id = '2'"), first)
+
+    def test_a_write_only_drops_the_entries_of_its_table(self):
+        self.create_people("people")
+        self.create_people("pets")
+        self.query("SELECT * FROM people")
+        self.query("SELECT * FROM pets")
+
+        self.query("INSERT INTO people VALUES (3, 'cid', 41)")
+        with mock.patch.object(routes, "run_query", wraps=routes.run_query) as run_query:
+            self.assertEqual(len(self.query("SELECT * FROM pets")["records"]), 2)
+            run_query.assert_not_called()
+            self.assertEqual(len(self.query("SELECT * FROM people")["records"]), 3)
+            run_query.assert_called_once()
+
+    def test_result_computed_before_a_write_is_not_cached(self):
+        cache = QueryResultCache()
+        generation = cache.generation("people")
+        cache.invalidate("people")
+        cache.put("key", "people", b"stale", generation)
+        self.assertIsNone(cache.get("key"))
+        cache.put("key", "people", b"fresh", cache.generation("people"))
+        self.assertEqual(cache.get("key"), b"fresh")
+
+
+class TestReaderPool(RoutesTestCase):
+    def test_selects_run_on_pooled_handlers_at_once(self):
+        self.create_people()
+        both_running = threading.Barrier(self.POOL_SIZE, timeout=5)
+        used = []
+        original = QueryHandler.execute_parsed
+
+        def execute_parsed(handler, parsed_query):
+            used.append(handler)
+            both_running.wait()  # Breaks unless the other SELECT runs at the same time
+            return original(handler, parsed_query)
+
+        with mock.patch.object(QueryHandler, "execute_parsed", autospec=True, side_effect=execute_parsed):
+            parsed_query = routes.parse_query("SELECT * FROM people")
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(routes.run_query(parsed_query)))
+                       for _ in range(self.POOL_SIZE)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual([result["records"] for result in results], [[[1, "ann", 30], [2, "bob", 25]]] * 2)
+        self.assertEqual(len(set(map(id, used))), self.POOL_SIZE)
+        self.assertNotIn(self.writer, used)
+        self.assertEqual(routes.reader_pool.qsize(), self.POOL_SIZE)
+
+    def test_writes_run_on_the_writer(self):
+        with mock.patch.object(self.writer, "execute_parsed", wraps=self.writer.execute_parsed) as execute_parsed:
+            self.create_people()
+        self.assertEqual(execute_parsed.call_count, 3)
+        self.assertEqual(routes.reader_pool.qsize(), self.POOL_SIZE)
+
+
+class TestReadWriteLock(unittest.TestCase):
+    def setUp(self):
+        self.lock = ReadWriteLock()
+
+    def start(self, target):
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        return thread
+
+    def test_readers_share_the_lock(self):
+        with self.lock.read():
+            acquired = threading.Event()
+
+            def read():
+                with self.lock.read():
+                    acquired.set()
+            self.start(read)
+            self.assertTrue(acquired.wait(5))
+
+    def test_writer_waits_for_readers(self):
+        acquired = threading.Event()
+
+        def write():
+            with self.lock.write():
+                acquired.set()
+        with self.lock.read():
+            self.start(write)
+            self.assertFalse(acquired.wait(0.1))
+        self.assertTrue(acquired.wait(5))
+
+    def test_waiting_writer_goes_before_new_readers(self):
+        order = []
+        done = []
+
+        def write():
+            with self.lock.write():
+                order.append("write")
+
+        def read():
+            with self.lock.read():
+                order.append("read")
+        with self.lock.read():
+            done.append(self.start(write))
+            while not self.lock._waiting_writers:
+                time.sleep(0.01)
+            done.append(self.start(read))
+            time.sleep(0.1)
+            self.assertEqual(order, [])
+        for thread in done:
+            thread.join(5)
+        self.assertEqual(order, ["write", "read"])
+
+
+if __name__ == "__main__":
+    unittest.main()
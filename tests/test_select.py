@@ -0,0 +1,225 @@
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from db.commands.create import CreateCommand
+from db.commands.select import SelectCommand
+from db.cursors.line_cursor import LineCursor
+from db.index_handling.implementations.bplus_tree import LeafPage, PAGE_SIZE
+from db.index_handling.index_factory import IndexFactory
+from db.storage_management.table_manager import TableManager
+
+
+class SelectTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.table_manager = TableManager(self.tmp)
+        self.table_manager.data_dir = self.tmp  # Keep the tables out of src/data
+        self.tables = []
+
+    def tearDown(self):
+        for table_name in self.tables:
+            IndexFactory.forget(*self.table_manager.get_table_info(table_name)["index_files"].values())
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def load_csv(self, table_name, text, **options):
+        """Create a table from CSV text, the first column is its primary key"""
+        file_path = os.path.join(self.tmp, f"{table_name}.csv")
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        result = CreateCommand(self.table_manager).execute(
+            {"table_name": table_name, "from_file": True, "file_path": file_path, "index_info": {}, **options})
+        if result["status"] == "success":
+            self.tables.append(table_name)
+        return result
+
+    def select(self, table_name, **filter):
+        parsed_query = {"table_name": table_name}
+        if filter:
+            parsed_query["filters"] = [filter]
+        return SelectCommand(self.table_manager).execute(parsed_query)["records"]
+
+    def scan(self, table_name, **filter):
+        """Records the sequential scan finds for filter, without any index"""
+        table_info = self.table_manager.get_table_info(table_name)
+        cursor = LineCursor(table_info["data_file"], self.table_manager.record_struct(table_info).size)
+        return SelectCommand(self.table_manager)._get_filtered_records(cursor, table_info, filter)
+
+
+class TestPrimaryKeyLookup(SelectTestCase):
+    def setUp(self):
+        super().setUp()
+        rows = [f"{n},{n * 1.5},{n * 10}" for n in range(1, 51)] + ["7,0.5,1"]
+        self.assertEqual(self.load_csv("scores", "id,score,total\n" + "\n".join(rows) + "\n")["status"], "success")
+        self.table_info = self.table_manager.get_table_info("scores")
+
+    def test_matches_the_scan(self):
+        command = SelectCommand(self.table_manager)
+        for value in ("1", "7", "50", "51", "-3"):
+            filter = {"column": "id", "operation": "=", "value": value}
+            self.assertTrue(command._is_key_lookup(self.table_info, filter))
+            self.assertEqual(self.select("scores", **filter), self.scan("scores", **filter))
+        # A CSV file can repeat a primary key
+        self.assertEqual(self.select("scores", column="id", operation="=", value="7"),
+                         [[7, 10.5, 70], [7, 0.5, 1]])
+
+    def test_missing_index_file_is_built_from_the_data(self):
+        index_file = self.table_info["index_files"]["id"]
+        os.remove(index_file)
+        IndexFactory.forget(index_file)
+
+        self.assertEqual(self.select("scores", column="id", operation="=", value="5"), [[5, 7.5, 50]])
+
+    def test_empty_index_of_an_older_import_is_rebuilt(self):
+        # Header without a key format and an empty root leaf
+        index_file = self.table_info["index_files"]["id"]
+        with open(index_file, "wb") as f:
+            f.write(struct.pack("=q", 1).ljust(PAGE_SIZE, b"\x00"))
+            f.write(LeafPage(1, -1, [], -1).pack())
+        IndexFactory.forget(index_file)
+
+        self.assertEqual(self.select("scores", column="id", operation="=", value="5"), [[5, 7.5, 50]])
+        self.assertEqual(len(self.select("scores", column="id", operation="=", value="7")), 2)
+
+
+class TestRangeLookup(SelectTestCase):
+    NAMES = ["ann", "bob", "abcdefghij", "abcdefghik", "abcdefgh", "zz"]
+    SCORES = [-2.5, -0.0, 0.0, 0.1, 1.5, 3.75]
+
+    def setUp(self):
+        super().setUp()
+        rows = [f"{n},{self.NAMES[n % 6]},{self.SCORES[n * 7 % 6]}" for n in range(60)]
+        result = self.load_csv("scores", "id,name,score\n" + "\n".join(rows) + "\n",
+                               index_info={"name": "bplus", "score": "bplus"})
+        self.assertEqual(result["status"], "success")
+        self.table_info = self.table_manager.get_table_info("scores")
+        for position in range(0, 60, 7):
+            self.table_manager.mark_deleted(self.table_info, position)
+
+    def between(self, column, low, high):
+        return {"column": column, "operation": "BETWEEN", "from": low, "to": high}
+
+    def test_matches_the_scan(self):
+        command = SelectCommand(self.table_manager)
+        for filter in (self.between("id", "5", "'17'"), self.between("id", "50", "99"),
+                       self.between("score", "-0", "0.1"), self.between("score", "'-3'", "0"),
+                       self.between("score", "1.5", "-1"), self.between("name", "'abcdefgh'", "'abcdefghij'"),
+                       self.between("name", "b", "'zz'")):
+            self.assertTrue(command._is_range_lookup(self.table_info, filter))
+            self.assertCountEqual(self.select("scores", **filter), self.scan("scores", **filter))
+
+    def test_records_come_in_key_order(self):
+        records = self.select("scores", **self.between("score", "-10", "10"))
+        self.assertEqual([record[2] for record in records], sorted(record[2] for record in records))
+        self.assertEqual(len(records), 60 - 9)
+
+    def test_operands_without_a_key_are_scanned(self):
+        filter = self.between("score", "'a'", "'z'")
+        self.assertEqual(self.select("scores", **filter), self.scan("scores", **filter))
+
+
+class TestScanFilters(SelectTestCase):
+    """Filters on columns without an index, compared a scan chunk at a time"""
+
+    def setUp(self):
+        super().setUp()
+        names = ["ann", "bob", "cid", "dan", "eve"]
+        self.rows = [[n, names[n % 5], n * 0.25 - 3] for n in range(40)]
+        text = "id,name,score\n" + "".join(f"{n},{name},{score}\n" for n, name, score in self.rows)
+        self.assertEqual(self.load_csv("scores", text)["status"], "success")
+        table_info = self.table_manager.get_table_info("scores")
+        for position in range(0, 40, 9):
+            self.table_manager.mark_deleted(table_info, position)
+        self.live = [row for row in self.rows if row[0] % 9]
+
+    def where(self, col, test):
+        return [row for row in self.live if test(row[col])]
+
+    def test_equality(self):
+        self.assertEqual(self.scan("scores", column="id", operation="=", value="12"), self.where(0, lambda v: v == 12))
+        self.assertEqual(self.scan("scores", column="name", operation="=", value="cid"),
+                         self.where(1, lambda v: v == "cid"))
+        self.assertEqual(self.scan("scores", column="score", operation="=", value="1.5"),
+                         self.where(2, lambda v: v == 1.5))
+        # Deleted records never match
+        self.assertEqual(self.scan("scores", column="id", operation="=", value="9"), [])
+
+    def test_between(self):
+        for col, column, low, high in ((0, "id", 5, 20), (1, "name", "b", "d"), (2, "score", -1.25, 2)):
+            filter = {"column": column, "operation": "BETWEEN", "from": f"'{low}'", "to": str(high)}
+            self.assertEqual(self.scan("scores", **filter), self.where(col, lambda v: low <= v <= high))
+
+    def test_operands_outside_the_column_range(self):
+        self.assertEqual(self.scan("scores", column="id", operation="=", value=str(2**32 + 12)), [])
+        self.assertEqual(self.scan("scores", column="id", operation="BETWEEN", **{"from": str(-2**70), "to": str(2**70)}),
+                         self.live)
+
+    def test_operands_that_do_not_convert_are_compared_as_text(self):
+        self.assertEqual(self.scan("scores", column="id", operation="BETWEEN", **{"from": "1.5", "to": "3"}),
+                         self.where(0, lambda v: "1.5" <= str(v) <= "3"))
+        self.assertEqual(self.scan("scores", column="score", operation="=", value="x"), [])
+
+
+def legacy_varchar_prefix(row_num):
+    """Prefix older CSV loads put before every VARCHAR value"""
+    return b"\x00" * 4 + row_num.to_bytes(4, "little").decode("latin-1").encode()
+
+
+class TestCsvVarchars(SelectTestCase):
+    ROWS = [["k1", "ann", "12"], ["k2", "bob", "7"], ["k3", "cid", "12"], ["k4", "dée", "3"]]
+
+    def setUp(self):
+        super().setUp()
+        text = "code,name,qty\n" + "".join(",".join(row) + "\n" for row in self.ROWS)
+        columns = [{"name": "code", "type": "VARCHAR[20]"}, {"name": "name", "type": "VARCHAR[20]"},
+                   {"name": "qty", "type": "INT"}]
+        result = self.load_csv("items", text, columns=columns, index_info={"name": "bplus"})
+        self.assertEqual(result["status"], "success")
+        self.table_info = self.table_manager.get_table_info("items")
+        self.expected = [[code, name, int(qty)] for code, name, qty in self.ROWS]
+
+    def add_legacy_prefixes(self):
+        """Rewrite the table as an older CSV load stored it and drop its indexes"""
+        record_struct = self.table_manager.record_struct(self.table_info)
+        with open(self.table_info["data_file"], "r+b") as f:
+            data = bytearray(f.read())
+            for row_num in range(1, len(self.ROWS) + 1):
+                offset = (row_num - 1) * record_struct.size
+                marker, code, name, qty = record_struct.unpack_from(data, offset)
+                prefix = legacy_varchar_prefix(row_num)
+                record_struct.pack_into(data, offset, marker, prefix + code, prefix + name, qty)
+            f.seek(0)
+            f.write(data)
+        for index_file in self.table_info["index_files"].values():
+            os.remove(index_file)
+            IndexFactory.forget(index_file)
+
+    def check_queries(self):
+        self.assertEqual(self.select("items"), self.expected)
+        for column, value in (("name", "bob"), ("name", "dée"), ("code", "k3"), ("code", "k9")):
+            filter = {"column": column, "operation": "=", "value": value}
+            wanted = [row for row in self.expected if row[0 if column == "code" else 1] == value]
+            self.assertEqual(self.select("items", **filter), wanted)
+            self.assertEqual(self.scan("items", **filter), wanted)
+        self.assertEqual(self.scan("items", column="name", operation="BETWEEN", **{"from": "b", "to": "d"}),
+                         self.expected[1:3])
+        # Operands the column type cannot hold are compared as text
+        self.assertEqual(self.scan("items", column="name", operation="=", value="x" * 30), [])
+
+    def test_values_load_without_a_prefix(self):
+        with open(self.table_info["data_file"], "rb") as f:
+            self.assertEqual(f.read(3), b"\x00k1")  # Deletion marker, then the value
+        self.check_queries()
+
+    def test_values_of_an_older_load_with_row_number_prefixes(self):
+        self.add_legacy_prefixes()
+        self.check_queries()
+
+
+if __name__ == "__main__":
+    unittest.main()